@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+Пакетные add_many/contains_many фильтра Блюма против поштучных add/is_value:
+пропускная способность (строк в секунду) на пачке строк для обеих схем хэширования.
+Без numpy пакетные операции выполняются поштучно, и разницы не будет.
+
+Запуск: python3 benchmarks/bloom_batch.py [размер пачки]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from bloom_filter import BloomFilter, np  # noqa: E402
+
+FILTERS = [
+    ('poly 17/223', lambda n: BloomFilter(n * 10)),
+    ('fnv double', lambda n: BloomFilter(expected_items=n, fp_rate=0.01)),
+]
+
+
+def rate(n, fun):
+    start = time.perf_counter()
+    fun()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    added = ['url:/item/%d?ref=%d' % (i, i * 7) for i in range(n)]
+    queried = ['url:/item/%d?ref=%d' % (i, i * 7) for i in range(n // 2, n + n // 2)]
+    print('numpy: %s, batch: %d' % (np is not None, n))
+    print('%12s %14s %14s %14s %14s' % (
+        'filter', 'add/s', 'add_many/s', 'is_value/s', 'contains/s'))
+    for (name, make) in FILTERS:
+        single = make(n)
+        batch = make(n)
+        add_rate = rate(n, lambda: [single.add(s) for s in added])
+        add_many_rate = rate(n, lambda: batch.add_many(added))
+        is_value_rate = rate(n, lambda: [single.is_value(s) for s in queried])
+        contains_rate = rate(n, lambda: batch.contains_many(queried))
+        print('%12s %14.0f %14.0f %14.0f %14.0f' % (
+            name, add_rate, add_many_rate, is_value_rate, contains_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+"""
+Масштабируемый фильтр Блюма (ScalableBloomFilter): фактическая доля ложных
+срабатываний после добавления строк, намного больше расчетного количества
+первого слоя, для нескольких видов отсутствующих строк, рядом с оценкой
+fp_rate() и заданной границей.
+
+Запуск: python3 benchmarks/bloom_scalable.py [количество строк] [количество запросов]
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from bloom_filter import ScalableBloomFilter  # noqa: E402
+
+INITIAL_ITEMS = 1000
+FP_RATE = 0.01
+# виды отсутствующих строк: короткие, фиксированной длины, с другим префиксом
+QUERY_SHAPES = ('w%d', 'zz-%07d', 'out%d')
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    f = ScalableBloomFilter(INITIAL_ITEMS, FP_RATE)
+    for i in range(n):
+        f.add('key%d' % i)
+    print('items: %d, layers: %d, size: %d KiB, bound: %.4f, estimate: %.4f' % (
+        n, f.layer_count(), f.filter_len() // 8192, FP_RATE, f.fp_rate()))
+    print('%10s %10s' % ('queries', 'fp rate'))
+    for shape in QUERY_SHAPES:
+        fp = sum(f.is_value(shape % i) for i in range(queries))
+        print('%10s %10.4f' % (shape, fp / queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+"""
+Сравнение памяти NativeDictionary (параллельные списки размера max_size)
+и CompactNativeDictionary (узкий массив номеров + плотные массивы записей)
+при разном коэффициенте заполнения. Память считается через tracemalloc,
+без учета самих ключей и значений (они создаются заранее и общие).
+
+Запуск: python3 benchmarks/dict_memory.py [количество пар]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from native_dictionary import CompactNativeDictionary, NativeDictionary  # noqa: E402
+
+LOADS = [0.1, 0.25, 0.5, 0.75]
+
+
+def measure(cls, size, keys):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    d = cls(size)
+    for (i, k) in enumerate(keys):
+        d.add(k, i)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return (d, used)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = ['key-%d' % i for i in range(n)]
+    print('%6s %10s %18s %18s %8s' % ('load', 'max_size', 'native, B/pair', 'compact, B/pair', 'ratio'))
+    for load in LOADS:
+        size = int(n / load)
+        (_, native) = measure(NativeDictionary, size, keys)
+        (compact, used) = measure(CompactNativeDictionary, size, keys)
+        assert compact.size() == n
+        print('%6.2f %10d %18.1f %18.1f %8.2f' % (load, size, native / n, used / n, native / used))
+
+
+if __name__ == '__main__':
+    main()
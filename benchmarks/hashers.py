@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""
+Сравнение стратегий хэширования (IHasher) на одной и той же HashTable:
+время заполнения и поиска, а также средняя длина цепочки пробирования
+(сколько слотов просматривается при поиске ключа).
+
+Запуск: python3 benchmarks/hashers.py [количество ключей]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from hasher import BuiltinHasher, DJB2Hasher, FNV1aHasher, PolynomialHasher, SumHasher  # noqa: E402
+from hashtable import HashTable  # noqa: E402
+
+HASHERS = [
+    ('djb2', DJB2Hasher()),
+    ('fnv1a', FNV1aHasher()),
+    ('poly31', PolynomialHasher(31)),
+    ('sum', SumHasher()),
+    ('builtin', BuiltinHasher()),
+]
+
+
+# средняя длина пробирования по гистограмме заполненной таблицы
+# (с ее фактическим шагом пробирования)
+def avg_probe(table):
+    hist = table.probe_histogram()
+    return sum((i + 1) * n for (i, n) in enumerate(hist)) / max(1, sum(hist))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = ['user:%08d' % i for i in range(n)]
+    size = n * 4 // 3 + 1
+    print('%10s %12s %12s %10s' % ('hasher', 'add, us/op', 'has, us/op', 'avg probe'))
+    for (name, hasher) in HASHERS:
+        table = HashTable(size, hasher=hasher)
+        start = time.perf_counter()
+        for k in keys:
+            table.add(k)
+        add_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for k in keys:
+            table.has(k)
+        has_time = time.perf_counter() - start
+        print('%10s %12.2f %12.2f %10.2f' % (
+            name, add_time / n * 1e6, has_time / n * 1e6, avg_probe(table)))
+
+
+if __name__ == '__main__':
+    main()
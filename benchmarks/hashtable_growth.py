@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+"""
+Замер средней задержки операций add/has в растущей HashTable (growable=True)
+на количествах ключей от 1e3 до 1e6.
+
+При поддержании коэффициента заполнения время одной операции
+не должно зависеть от количества ключей.
+
+Запуск: python3 benchmarks/hashtable_growth.py [макс. степень 10]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from hashtable import HashTable  # noqa: E402
+
+
+def bench(n):
+    keys = ['key-%d' % i for i in range(n)]
+    table = HashTable(16, growable=True)
+    start = time.perf_counter()
+    for k in keys:
+        table.add(k)
+    add_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for k in keys:
+        table.has(k)
+    has_time = time.perf_counter() - start
+    return add_time / n, has_time / n
+
+
+def main():
+    max_power = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    print('%10s %14s %14s' % ('keys', 'add, us/op', 'has, us/op'))
+    for power in range(3, max_power + 1):
+        n = 10 ** power
+        (add_op, has_op) = bench(n)
+        print('%10d %14.2f %14.2f' % (n, add_op * 1e6, has_op * 1e6))
+
+
+if __name__ == '__main__':
+    main()
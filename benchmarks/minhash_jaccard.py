@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+MinHash против точной меры Жаккара на PowerSet: попарное сравнение
+нескольких пересекающихся множеств. Для точного варианта меряется время
+intersection/union по всем парам, для MinHash - построение сигнатур
+и jaccard_matrix; выводится средняя и максимальная ошибка оценки.
+
+Запуск: python3 benchmarks/minhash_jaccard.py [размер множества] [количество множеств] [num_perm]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from minhash import MinHash, jaccard_matrix, np  # noqa: E402
+from powerset import PowerSet  # noqa: E402
+
+
+def make_sets(n, count):
+    # множества - окна разной ширины по общему каталогу, поэтому сходство пар разное
+    rnd = random.Random(7)
+    universe = ['doc:%08d' % i for i in range(n * 3)]
+    sets = []
+    for _ in range(count):
+        start = rnd.randrange(n * 2)
+        s = PowerSet(n * 4 // 3 + 1)
+        for v in universe[start:start + n]:
+            s.add(v)
+        sets.append(s)
+    return sets
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    num_perm = int(sys.argv[3]) if len(sys.argv) > 3 else 128
+    sets = make_sets(n, count)
+    print('numpy: %s, sets: %d x %d, num_perm: %d' % (np is not None, count, n, num_perm))
+
+    start = time.perf_counter()
+    exact = [[a.intersection(b).size() / a.union(b).size() for b in sets] for a in sets]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sketches = []
+    for s in sets:
+        m = MinHash(num_perm)
+        m.add_set(s)
+        sketches.append(m)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    estimate = jaccard_matrix(sketches)
+    compare_time = time.perf_counter() - start
+
+    errors = [abs(exact[i][j] - estimate[i][j])
+              for i in range(count) for j in range(count) if i != j]
+    print('%24s %10.3f s' % ('exact all pairs', exact_time))
+    print('%24s %10.3f s' % ('minhash signatures', build_time))
+    print('%24s %10.3f s' % ('minhash all pairs', compare_time))
+    print('%24s %10.4f' % ('mean abs error', sum(errors) / len(errors)))
+    print('%24s %10.4f' % ('max abs error', max(errors)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""
+Параллельные intersection/difference (parallel_intersection, parallel_difference)
+против обычных операций PowerSet на двух больших пересекающихся множествах строк.
+Выводится время и ускорение относительно последовательного варианта.
+Последовательная часть родителя - запуск процессов и перенос готовых слотов
+в результат; остальная работа делится между процессами, поэтому ускорение
+имеет смысл только при нескольких доступных ядрах (выводится их количество).
+
+Запуск: python3 benchmarks/parallel_setops.py [размер множества] [количество процессов]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from powerset import PowerSet, parallel_difference, parallel_intersection  # noqa: E402
+
+
+def make_set(start, n):
+    s = PowerSet(n * 4 // 3 + 1)
+    for i in range(start, start + n):
+        s.add('key:%010d' % i)
+    return s
+
+
+# количество ядер, доступных процессу
+def cpu_count():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+def timed(fun):
+    start = time.perf_counter()
+    result = fun()
+    return (time.perf_counter() - start, result)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else cpu_count()
+    a = make_set(0, n)
+    b = make_set(n // 2, n)
+    print('sets: 2 x %d, overlap: %d, workers: %d, cpus: %d' % (
+        n, n - n // 2, workers, cpu_count()))
+    print('%14s %12s %12s %9s' % ('operation', 'serial, s', 'parallel, s', 'speedup'))
+    for (name, serial, parallel) in [
+            ('intersection', a.intersection, parallel_intersection),
+            ('difference', a.difference, parallel_difference)]:
+        (serial_time, expected) = timed(lambda: serial(b))
+        (parallel_time, result) = timed(lambda: parallel(a, b, workers))
+        assert result.size() == expected.size()
+        print('%14s %12.3f %12.3f %9.2f' % (
+            name, serial_time, parallel_time, serial_time / parallel_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Сравнение схем пробирования (PROBING_LINEAR и PROBING_ROBIN_HOOD) таблиц
+HashTable, NativeDictionary и PowerSet со стратегиями хэширования по умолчанию
+при высоком коэффициенте заполнения: гистограмма длин пробирования,
+средняя длина, p99 и максимум, а также задержка отдельного поиска имеющихся
+и отсутствующих значений (медиана и p99; каждый has() замеряется отдельно,
+поэтому в задержку входит и накладной расход часов, около 0.1 мкс).
+Гистограмма печатается для HashTable при наибольшем заполнении.
+
+Запуск: python3 benchmarks/probe_lengths.py [размер таблицы]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'level1'))
+
+from hashtable import HashTable  # noqa: E402
+from native_dictionary import NativeDictionary  # noqa: E402
+from powerset import PowerSet  # noqa: E402
+
+# (название, класс, добавление ключа, проверка наличия ключа)
+CONTAINERS = [
+    ('table', HashTable, HashTable.add, HashTable.has),
+    ('dict', NativeDictionary, lambda d, k: d.add(k, k), NativeDictionary.has_key),
+    ('set', PowerSet, PowerSet.add, PowerSet.has),
+]
+SCHEMES = [
+    ('linear', HashTable.PROBING_LINEAR),
+    ('robin hood', HashTable.PROBING_ROBIN_HOOD),
+]
+LOADS = [0.5, 0.75, 0.9, 0.95]
+
+
+def percentile(hist, q):
+    # длина пробирования (в пробах), которую не превышает доля q значений
+    total = sum(hist)
+    acc = 0
+    result = len(hist)
+    for (i, n) in enumerate(hist):
+        acc += n
+        if acc >= q * total:
+            result = i + 1
+            break
+    return result
+
+
+# отсортированные задержки проверки has по каждому значению, мкс
+def latencies(has, table, keys):
+    clock = time.perf_counter_ns
+    result = []
+    for k in keys:
+        start = clock()
+        has(table, k)
+        result.append((clock() - start) / 1000)
+    result.sort()
+    return result
+
+
+def print_histogram(hist, width=50):
+    top = max(hist)
+    for (i, n) in enumerate(hist[:12]):
+        print('    %3d | %-*s %d' % (i + 1, width, '#' * max(n * width // top, n > 0), n))
+    if len(hist) > 12:
+        print('    ... | еще %d значений длиннее 12 проб' % sum(hist[12:]))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20011
+    print('%6s %6s %12s %8s %6s %6s %10s %10s %10s %10s' % (
+        'load', 'kind', 'scheme', 'mean', 'p99', 'max',
+        'hit p50', 'hit p99', 'miss p50', 'miss p99'))
+    for load in LOADS:
+        n = int(size * load)
+        keys = ['key-%d' % i for i in range(n)]
+        misses = ['miss-%d' % i for i in range(n)]
+        for (kind, cls, add, has) in CONTAINERS:
+            for (name, probing) in SCHEMES:
+                table = cls(size, probing=probing)
+                for k in keys:
+                    add(table, k)
+                hist = table.probe_histogram()
+                mean = sum((i + 1) * c for (i, c) in enumerate(hist)) / n
+                hit = latencies(has, table, keys)
+                miss = latencies(has, table, misses)
+                print('%6.2f %6s %12s %8.2f %6d %6d %10.2f %10.2f %10.2f %10.2f' % (
+                    load, kind, name, mean, percentile(hist, 0.99), len(hist),
+                    hit[n // 2], hit[n * 99 // 100], miss[n // 2], miss[n * 99 // 100]))
+                if load == LOADS[-1] and cls is HashTable:
+                    print_histogram(hist)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 
 from abc import ABC, abstractmethod
+from math import ceil, log
+import mmap
+import struct
+
+from hasher import FNV1aHasher, IBatchHasher, PolynomialHasher, fmix64
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class AbstractBloomFilter(ABC):
@@ -32,35 +42,498 @@ class AbstractBloomFilter(ABC):
 
 
 class BloomFilter(AbstractBloomFilter):
+    # схемы получения номеров битов строки
+    HASH_SCHEME_HASHERS = 0  # по биту на каждую стратегию из списка hashers
+    HASH_SCHEME_DOUBLE = 1  # k битов двойным хэшированием из одного 64-битного FNV-1a
+    HASH_SCHEME_BLOCKED = 2  # k битов внутри одного блока BLOCK_BITS (BlockedBloomFilter)
+
+    # размер блока HASH_SCHEME_BLOCKED - 64-байтная строка кэша
+    BLOCK_BITS = 512
+
+    SAVE_STATUS_OK = 0
+    SAVE_STATUS_FAIL = 1  # стратегии хэширования нельзя записать в заголовок
+
+    MERGE_STATUS_OK = 0
+    MERGE_STATUS_FAIL = 1  # фильтры несовместимы, фильтр не изменен
 
     # KOHCTPYKTOP
-    def __init__(self, f_len):
+    # hashers - список стратегий хэширования (IHasher), каждая задает один бит строки;
+    # по умолчанию два полиномиальных хэша с множителями 17 и 223.
+    # Если задано expected_items, f_len и hashers не используются: длина фильтра
+    # и количество битов на строку k выбираются так, чтобы при expected_items строках
+    # доля ложных срабатываний не превышала fp_rate, а номера битов считаются
+    # двойным хэшированием (HASH_SCHEME_DOUBLE)
+    # предусловие: задано f_len или expected_items > 0 и 0 < fp_rate < 1
+    def __init__(self, f_len=None, hashers=None, expected_items=None, fp_rate=0.01):
+        if expected_items is not None:
+            # m = -n * ln(p) / ln(2)**2, k = m / n * ln(2)
+            f_len = max(1, ceil(-expected_items * log(fp_rate) / log(2) ** 2))
+            self.__hash_count__ = max(1, round(f_len / expected_items * log(2)))
+            self.__hash_scheme__ = self.HASH_SCHEME_DOUBLE
+            hashers = [FNV1aHasher()]
+        else:
+            if hashers is None:
+                hashers = [PolynomialHasher(17), PolynomialHasher(223)]
+            self.__hash_count__ = len(hashers)
+            self.__hash_scheme__ = self.HASH_SCHEME_HASHERS
         self.__filter_len__ = f_len
-        self.__bitmask__ = 0
-
-    def __hash1__(self, str1):
-        acc = 0
-        for c in str1:
-            code = ord(c)
-            acc = ((acc * 17) + code) % self.__filter_len__
-        return (1 << acc)
-
-    def __hash2__(self, str1):
-        acc = 0
-        for c in str1:
-            code = ord(c)
-            acc = ((acc * 223) + code) % self.__filter_len__
-        return (1 << acc)
+        self.__hashers__ = hashers
+        self.__save_status__ = self.SAVE_STATUS_FAIL
+        self.__merge_status__ = self.MERGE_STATUS_FAIL
+        self.clear()
+
+    # номера битов строки
+    def __indexes__(self, str1):
+        if self.__hash_scheme__ == self.HASH_SCHEME_DOUBLE:
+            # g_i = h1 + i * h2 по половинам одного 64-битного хэша;
+            # половины FNV-1a у похожих строк зависимы, поэтому хэш сначала
+            # перемешивается fmix64; h2 нечетный, чтобы не вырождаться в один бит при h2 = 0
+            h = fmix64(self.__hashers__[0].hash_fun(str1))
+            h1 = h & 0xFFFFFFFF
+            h2 = (h >> 32) | 1
+            return [(h1 + i * h2) % self.__filter_len__ for i in range(self.__hash_count__)]
+        if self.__hash_scheme__ == self.HASH_SCHEME_BLOCKED:
+            # старшая половина хэша выбирает блок, младшая - k разных битов в нем
+            # (шаг нечетный, поэтому первые 512 номеров не повторяются)
+            h = fmix64(self.__hashers__[0].hash_fun(str1))
+            base = ((h >> 32) % (self.__filter_len__ // self.BLOCK_BITS)) * self.BLOCK_BITS
+            a = h & 0xFFFF
+            b = ((h >> 16) & 0xFFFF) | 1
+            return [base + ((a + i * b) & (self.BLOCK_BITS - 1)) for i in range(self.__hash_count__)]
+        return [hasher.hash_fun(str1) % self.__filter_len__ for hasher in self.__hashers__]
+
+    # матрица len(strs) x k номеров битов (uint64), те же, что у __indexes__
+    def __np_indexes__(self, strs):
+        if self.__hash_scheme__ == self.HASH_SCHEME_DOUBLE:
+            h = __np_fmix64__(__np_hashes__(self.__hashers__[0], strs))
+            h1 = h & np.uint64(0xFFFFFFFF)
+            h2 = (h >> np.uint64(32)) | np.uint64(1)
+            i = np.arange(self.__hash_count__, dtype=np.uint64)
+            return (h1[:, None] + i * h2[:, None]) % np.uint64(self.__filter_len__)
+        if self.__hash_scheme__ == self.HASH_SCHEME_BLOCKED:
+            h = __np_fmix64__(__np_hashes__(self.__hashers__[0], strs))
+            blocks = np.uint64(self.__filter_len__ // self.BLOCK_BITS)
+            base = ((h >> np.uint64(32)) % blocks) * np.uint64(self.BLOCK_BITS)
+            a = h & np.uint64(0xFFFF)
+            b = ((h >> np.uint64(16)) & np.uint64(0xFFFF)) | np.uint64(1)
+            i = np.arange(self.__hash_count__, dtype=np.uint64)
+            return base[:, None] + ((a[:, None] + i * b[:, None]) & np.uint64(self.BLOCK_BITS - 1))
+        columns = [__np_hashes__(hasher, strs) for hasher in self.__hashers__]
+        return np.stack(columns, axis=1) % np.uint64(self.__filter_len__)
 
     # КОМАНДЫ
     def add(self, str1):
-        mask = self.__hash1__(str1) | self.__hash2__(str1)
-        self.__bitmask__ |= mask
+        bits = self.__bits__
+        for i in self.__indexes__(str1):
+            byte = bits[i >> 3]
+            mask = 1 << (i & 7)
+            if not byte & mask:
+                bits[i >> 3] = byte | mask
+                self.__set_bits__ += 1
+
+    # с numpy пачка строк хэшируется векторно, биты устанавливаются одной операцией
+    def add_many(self, strs):
+        # strs может быть итератором, а numpy-хэшированию нужна последовательность
+        strs = list(strs)
+        if np is None:
+            for str1 in strs:
+                self.add(str1)
+        elif strs:
+            idx = np.unique(self.__np_indexes__(strs))
+            bits = np.frombuffer(self.__bits__, dtype=np.uint8)
+            shift = (idx & 7).astype(np.uint8)
+            # новые биты считаются до установки, без пересчета всего массива
+            self.__set_bits__ += int(np.count_nonzero(((bits[idx >> 3] >> shift) & 1) == 0))
+            np.bitwise_or.at(bits, idx >> 3, np.left_shift(1, shift, dtype=np.uint8))
 
     def clear(self):
-        self.__bitmask__ = 0
+        # упакованный битовый массив: бит i - бит (i & 7) байта i >> 3;
+        # биты устанавливаются на месте, без создания длинных целых
+        self.__bits__ = bytearray((self.__filter_len__ + 7) // 8)
+        # количество установленных битов
+        self.__set_bits__ = 0
+
+    # записывает фильтр в файл path: заголовок FILE_HEADER, для HASH_SCHEME_HASHERS -
+    # пары (множитель, начальное значение) полиномиальных хэшей, затем битовый массив
+    # предусловие: стратегии хэширования - PolynomialHasher или схема не HASH_SCHEME_HASHERS
+    def save(self, path):
+        self.__save_status__ = self.SAVE_STATUS_FAIL
+        layout = self.__layout__()
+        if layout is not None:
+            (scheme, f_len, k, params) = layout
+            with open(path, 'wb') as f:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, scheme, k, f_len,
+                                         self.__set_bits__))
+                for (multiplier, init) in params:
+                    f.write(FILE_HASHER.pack(multiplier, init))
+                f.write(self.__bits__)
+            self.__save_status__ = self.SAVE_STATUS_OK
+
+    # объединяет (OR битовых массивов) с фильтрами filters за одну операцию над длинными целыми;
+    # предусловие: все фильтры с той же длиной, k и стратегиями хэширования
+    # постусловие: фильтр содержит строки всех фильтров, либо при несовместимости не изменен
+    def merge(self, filters):
+        self.__merge_status__ = self.MERGE_STATUS_FAIL
+        layout = self.__layout__()
+        if layout is None or any(other.__layout__() != layout for other in filters):
+            return
+        acc = int.from_bytes(self.__bits__, 'little')
+        for other in filters:
+            acc |= int.from_bytes(other.__bits__, 'little')
+        self.__bits__[:] = acc.to_bytes(len(self.__bits__), 'little')
+        self.__set_bits__ = acc.bit_count()
+        self.__merge_status__ = self.MERGE_STATUS_OK
 
     # ЗАПРОСЫ
     def is_value(self, str1):
-        mask = self.__hash1__(str1) | self.__hash2__(str1)
-        return (self.__bitmask__ & mask) == mask
+        bits = self.__bits__
+        for i in self.__indexes__(str1):
+            if not bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    # постусловие: для каждой строки strs - результат is_value, в том же порядке;
+    # с numpy - массив numpy.bool_, иначе список bool
+    def contains_many(self, strs):
+        strs = list(strs)
+        if np is None:
+            return [self.is_value(str1) for str1 in strs]
+        if not strs:
+            return np.zeros(0, dtype=bool)
+        idx = self.__np_indexes__(strs)
+        bits = np.frombuffer(self.__bits__, dtype=np.uint8)
+        return ((bits[idx >> 3] >> (idx & 7).astype(np.uint8)) & 1).all(axis=1)
+
+    # доля установленных битов; при 1/2 и оптимальном k фильтр заполнен
+    # на расчетную долю ложных срабатываний
+    def fill_ratio(self):
+        return self.__set_bits__ / self.__filter_len__
+
+    # оценка доли ложных срабатываний по фактическому заполнению
+    def fp_rate(self):
+        return self.fill_ratio() ** self.__hash_count__
+
+    # длина битового массива
+    def filter_len(self):
+        return self.__filter_len__
+
+    # количество битов на строку
+    def hash_count(self):
+        return self.__hash_count__
+
+    def hash_scheme(self):
+        return self.__hash_scheme__
+
+    def get_save_status(self):
+        return self.__save_status__
+
+    def get_merge_status(self):
+        return self.__merge_status__
+
+    # вспомогательные private функции
+    # (схема, длина, k, параметры полиномиальных хэшей) - по ним проверяется совместимость
+    # фильтров; None, если стратегии хэширования нельзя описать параметрами
+    def __layout__(self):
+        params = ()
+        if self.__hash_scheme__ == self.HASH_SCHEME_HASHERS:
+            if any(type(h) is not PolynomialHasher for h in self.__hashers__):
+                return None
+            params = tuple((h.__multiplier__, h.__initial__) for h in self.__hashers__)
+        return (self.__hash_scheme__, self.__filter_len__, self.__hash_count__, params)
+
+
+# формат файла фильтра: магическое число, версия формата, схема хэширования,
+# k, длина в битах, количество установленных битов (little-endian).
+# Версия 2: номера битов HASH_SCHEME_DOUBLE и HASH_SCHEME_BLOCKED считаются по fmix64
+FILE_MAGIC = b'BLMF'
+FILE_VERSION = 2
+FILE_HEADER = struct.Struct('<4sBBHQQ')
+# параметры одного PolynomialHasher: множитель и начальное значение
+FILE_HASHER = struct.Struct('<QQ')
+
+
+# читает фильтр, записанный BloomFilter.save (BlockedBloomFilter для HASH_SCHEME_BLOCKED).
+# При use_mmap битовый массив не копируется в память процесса: запросы читают
+# отображенный файл, а добавления меняют только копии страниц (mmap.ACCESS_COPY),
+# файл при этом не изменяется.
+# Неверный или неполный заголовок (неизвестная схема, k = 0, длина не кратна блоку
+# для HASH_SCHEME_BLOCKED, обрезанные параметры хэшей) - ValueError.
+def load_bloom_filter(path, use_mmap=True):
+    with open(path, 'rb') as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) != FILE_HEADER.size:
+            raise ValueError('not a BloomFilter file: %s' % path)
+        (magic, version, scheme, k, f_len, set_bits) = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError('not a BloomFilter file: %s' % path)
+        if scheme not in (BloomFilter.HASH_SCHEME_HASHERS, BloomFilter.HASH_SCHEME_DOUBLE,
+                          BloomFilter.HASH_SCHEME_BLOCKED) or k < 1 or f_len < 1 or \
+                scheme == BloomFilter.HASH_SCHEME_BLOCKED and f_len % BloomFilter.BLOCK_BITS:
+            raise ValueError('invalid BloomFilter header: %s' % path)
+        hashers = [FNV1aHasher()]
+        if scheme == BloomFilter.HASH_SCHEME_HASHERS:
+            hashers = []
+            for _ in range(k):
+                params = f.read(FILE_HASHER.size)
+                if len(params) != FILE_HASHER.size:
+                    raise ValueError('truncated BloomFilter file: %s' % path)
+                hashers.append(PolynomialHasher(*FILE_HASHER.unpack(params)))
+        offset = f.tell()
+        length = (f_len + 7) // 8
+        if use_mmap and length > 0:
+            bits = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+            bits = bits[offset:offset + length]
+        else:
+            bits = bytearray(f.read(length))
+        if len(bits) != length:
+            raise ValueError('truncated BloomFilter file: %s' % path)
+    cls = BlockedBloomFilter if scheme == BloomFilter.HASH_SCHEME_BLOCKED else BloomFilter
+    result = cls.__new__(cls)
+    result.__filter_len__ = f_len
+    result.__hash_count__ = k
+    result.__hash_scheme__ = scheme
+    result.__hashers__ = hashers
+    result.__save_status__ = BloomFilter.SAVE_STATUS_FAIL
+    result.__merge_status__ = BloomFilter.MERGE_STATUS_FAIL
+    result.__bits__ = bits
+    result.__set_bits__ = set_bits
+    return result
+
+
+# хэши строк strs стратегией hasher в виде массива numpy.uint64.
+# FNV1aHasher и PolynomialHasher считаются векторно: строки кодируются в один
+# буфер (UTF-8 или UTF-32 - коды символов), упорядочиваются по убыванию длины,
+# и на j-м шаге обрабатывается j-й символ сразу у всех строк длиннее j;
+# переполнение uint64 дает тот же результат, что и & MASK64.
+# Прочие стратегии хэшируются по одной строке.
+# предусловие: numpy установлен
+def __np_hashes__(hasher, strs):
+    if isinstance(hasher, FNV1aHasher):
+        encoded = [s.encode('utf-8') if isinstance(s, str) else bytes(s) for s in strs]
+        codes = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+        lens = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        acc = np.full(len(encoded), hasher.OFFSET_BASIS, dtype=np.uint64)
+        (prime, multiplier) = (np.uint64(hasher.PRIME), None)
+    elif isinstance(hasher, PolynomialHasher):
+        codes = np.frombuffer(''.join(strs).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        lens = np.fromiter((len(s) for s in strs), dtype=np.int64, count=len(strs))
+        acc = np.full(len(strs), hasher.__initial__, dtype=np.uint64)
+        (prime, multiplier) = (None, np.uint64(hasher.__multiplier__))
+    else:
+        if isinstance(hasher, IBatchHasher):
+            return np.array(hasher.hash_many(strs), dtype=np.uint64)
+        return np.array([hasher.hash_fun(s) for s in strs], dtype=np.uint64)
+    order = np.argsort(-lens, kind='stable')
+    starts = (np.cumsum(lens) - lens)[order]
+    sorted_lens = lens[order]
+    sorted_acc = acc[order]
+    # количество строк длиннее j для каждого j
+    active = np.searchsorted(-sorted_lens, -np.arange(sorted_lens[0] if len(lens) else 0), side='left')
+    for (j, n) in enumerate(active):
+        code = codes[starts[:n] + j]
+        if multiplier is None:
+            sorted_acc[:n] = (sorted_acc[:n] ^ code) * prime
+        else:
+            sorted_acc[:n] = sorted_acc[:n] * multiplier + code
+    acc[order] = sorted_acc
+    return acc
+
+
+# fmix64 для массива numpy.uint64 (переполнение при умножении - то же, что & MASK64)
+# предусловие: numpy установлен
+def __np_fmix64__(h):
+    h = h ^ (h >> np.uint64(33))
+    h = h * np.uint64(0xFF51AFD7ED558CCD)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xC4CEB9FE1A85EC53)
+    return h ^ (h >> np.uint64(33))
+
+
+# Фильтр Блюма со счетчиками вместо битов: поддерживает удаление строк.
+# Счетчик i - 4-битный полубайт (i & 1) байта i >> 1, т.е. два счетчика в байте.
+# Счетчик, достигший максимума 15, больше не меняется (насыщение): удаление
+# не может его уменьшить, иначе другие строки с этим счетчиком могли бы пропасть.
+# Номера счетчиков строки - те же, что номера битов BloomFilter с теми же параметрами.
+class CountingBloomFilter(BloomFilter):
+    COUNTER_MAX = 15
+    # количество ненулевых полубайтов для каждого значения байта
+    __NONZERO_NIBBLES__ = bytes((b & 0xF != 0) + (b >> 4 != 0) for b in range(256))
+
+    ADD_STATUS_OK = 0
+    ADD_STATUS_SATURATED = 1  # строка добавлена, но какой-то из ее счетчиков насыщен
+
+    REMOVE_STATUS_OK = 0
+    REMOVE_STATUS_UNDERFLOW = 1  # строки нет в фильтре (есть нулевой счетчик), фильтр не изменен
+    REMOVE_STATUS_SATURATED = 2  # строка удалена, но насыщенные счетчики остались как есть
+
+    # KOHCTPYKTOP
+    # параметры - как у BloomFilter
+    def __init__(self, f_len=None, hashers=None, expected_items=None, fp_rate=0.01):
+        super().__init__(f_len, hashers, expected_items, fp_rate)
+        self.__add_status__ = self.ADD_STATUS_OK
+        self.__remove_status__ = self.REMOVE_STATUS_OK
+
+    # КОМАНДЫ
+    def add(self, str1):
+        self.__add_status__ = self.ADD_STATUS_OK
+        counters = self.__counters__
+        for i in self.__indexes__(str1):
+            shift = (i & 1) << 2
+            c = (counters[i >> 1] >> shift) & 0xF
+            if c < self.COUNTER_MAX:
+                counters[i >> 1] += 1 << shift
+            if c + 1 >= self.COUNTER_MAX:
+                self.__add_status__ = self.ADD_STATUS_SATURATED
+
+    def add_many(self, strs):
+        for str1 in strs:
+            self.add(str1)
+
+    # предусловие: строка была добавлена в фильтр
+    # постусловие: счетчики строки уменьшены на 1 (кроме насыщенных)
+    def remove(self, str1):
+        counters = self.__counters__
+        indexes = self.__indexes__(str1)
+        for i in indexes:
+            if not (counters[i >> 1] >> ((i & 1) << 2)) & 0xF:
+                self.__remove_status__ = self.REMOVE_STATUS_UNDERFLOW
+                return
+        self.__remove_status__ = self.REMOVE_STATUS_OK
+        for i in indexes:
+            shift = (i & 1) << 2
+            c = (counters[i >> 1] >> shift) & 0xF
+            if c == self.COUNTER_MAX:
+                self.__remove_status__ = self.REMOVE_STATUS_SATURATED
+            elif c > 0:
+                # номер может повторяться среди индексов строки
+                counters[i >> 1] -= 1 << shift
+
+    def clear(self):
+        self.__counters__ = bytearray((self.__filter_len__ + 1) // 2)
+
+    # ЗАПРОСЫ
+    def is_value(self, str1):
+        counters = self.__counters__
+        for i in self.__indexes__(str1):
+            if not (counters[i >> 1] >> ((i & 1) << 2)) & 0xF:
+                return False
+        return True
+
+    def contains_many(self, strs):
+        strs = list(strs)
+        if np is None:
+            return [self.is_value(str1) for str1 in strs]
+        if not strs:
+            return np.zeros(0, dtype=bool)
+        idx = self.__np_indexes__(strs)
+        counters = np.frombuffer(self.__counters__, dtype=np.uint8)
+        shift = ((idx & 1) << 2).astype(np.uint8)
+        return ((counters[idx >> 1] >> shift) & 0xF).all(axis=1)
+
+    # доля ненулевых счетчиков
+    def fill_ratio(self):
+        return sum(self.__counters__.translate(self.__NONZERO_NIBBLES__)) / self.__filter_len__
+
+    # значение счетчика i (0..COUNTER_MAX)
+    def counter(self, i):
+        return (self.__counters__[i >> 1] >> ((i & 1) << 2)) & 0xF
+
+    def get_add_status(self):
+        return self.__add_status__
+
+    def get_remove_status(self):
+        return self.__remove_status__
+
+    # вспомогательные private функции
+    # счетчики не сохраняются и не объединяются: save и merge завершаются с FAIL
+    def __layout__(self):
+        return None
+
+
+# Блочный фильтр Блюма: все k битов строки лежат в одном блоке из BLOCK_BITS
+# битов (одна строка кэша), поэтому проверка строки обращается к памяти один раз,
+# а не в k случайных местах большого массива. Плата - немного большая доля ложных
+# срабатываний при той же длине, т.к. блоки заполняются неравномерно.
+# Длина округляется вверх до целого числа блоков.
+class BlockedBloomFilter(BloomFilter):
+
+    # KOHCTPYKTOP
+    # hash_count - количество битов на строку;
+    # если задано expected_items, длина и hash_count рассчитываются как у BloomFilter
+    # предусловие: задано f_len или expected_items > 0 и 0 < fp_rate < 1
+    def __init__(self, f_len=None, hash_count=8, expected_items=None, fp_rate=0.01):
+        # длина, k и статусы - как у BloomFilter, затем длина округляется до блоков
+        super().__init__(f_len, None, expected_items, fp_rate)
+        if expected_items is None:
+            self.__hash_count__ = hash_count
+        self.__filter_len__ = max(1, ceil(self.__filter_len__ / self.BLOCK_BITS)) * self.BLOCK_BITS
+        self.__hash_scheme__ = self.HASH_SCHEME_BLOCKED
+        self.__hashers__ = [FNV1aHasher()]
+        self.clear()
+
+
+# Масштабируемый фильтр Блюма: стопка BloomFilter, рассчитанных на растущее
+# количество строк. Строки добавляются в последний слой; когда доля его
+# установленных битов достигает fill_threshold, добавляется новый слой в growth раз
+# больше с долей ложных срабатываний в tightening раз меньше. Суммарная доля
+# ложных срабатываний ограничена fp_rate при любом количестве строк:
+# p * (1 - r) * (1 + r + r**2 + ...) = p, а память растет по мере поступления строк.
+class ScalableBloomFilter(AbstractBloomFilter):
+
+    # KOHCTPYKTOP
+    # initial_items - расчетное количество строк первого слоя
+    # предусловие: initial_items > 0, 0 < fp_rate < 1, growth >= 1, 0 < tightening < 1
+    def __init__(self, initial_items=1000, fp_rate=0.01, growth=2,
+                 tightening=0.5, fill_threshold=0.5):
+        self.__initial_items__ = initial_items
+        self.__fp_rate__ = fp_rate
+        self.__growth__ = growth
+        self.__tightening__ = tightening
+        self.__fill_threshold__ = fill_threshold
+        self.clear()
+
+    # КОМАНДЫ
+    # строка, которая уже находится в фильтре, повторно не добавляется,
+    # чтобы не заполнять последний слой дубликатами
+    def add(self, str1):
+        if not self.is_value(str1):
+            layer = self.__layers__[-1]
+            layer.add(str1)
+            if layer.fill_ratio() >= self.__fill_threshold__:
+                self.__add_layer__()
+
+    def clear(self):
+        self.__layers__ = []
+        self.__add_layer__()
+
+    # ЗАПРОСЫ
+    def is_value(self, str1):
+        for layer in self.__layers__:
+            if layer.is_value(str1):
+                return True
+        return False
+
+    def layer_count(self):
+        return len(self.__layers__)
+
+    # доля установленных битов последнего (заполняемого) слоя
+    def fill_ratio(self):
+        return self.__layers__[-1].fill_ratio()
+
+    # оценка суммарной доли ложных срабатываний по фактическому заполнению слоев
+    def fp_rate(self):
+        miss = 1.0
+        for layer in self.__layers__:
+            miss *= 1 - layer.fp_rate()
+        return 1 - miss
+
+    # суммарная длина битовых массивов слоев
+    def filter_len(self):
+        return sum(layer.filter_len() for layer in self.__layers__)
+
+    # вспомогательные private функции
+    def __add_layer__(self):
+        i = len(self.__layers__)
+        items = max(1, round(self.__initial_items__ * self.__growth__ ** i))
+        fp_rate = self.__fp_rate__ * (1 - self.__tightening__) * self.__tightening__ ** i
+        self.__layers__.append(BloomFilter(expected_items=items, fp_rate=fp_rate))
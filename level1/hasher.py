@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Хэш-функции (стратегии хэширования) для HashTable, NativeDictionary, PowerSet и BloomFilter.
+
+IHasher, SumHasher и DJB2Hasher - из level2/lesson3.py, с тем отличием, что
+результат считается по модулю 2**64 прямо в цикле (без роста длинного целого).
+IBatchHasher - расширение IHasher, позволяющее хэшировать сразу пачку ключей;
+реализация по умолчанию просто вызывает hash_fun для каждого ключа.
+MixedHasher перемешивает хэш другой стратегии финализатором fmix64.
+"""
+
+from abc import ABC, abstractmethod
+import zlib
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+# финализатор MurmurHash3 (fmix64): каждый бит результата зависит от всех битов h
+def fmix64(h):
+    h ^= h >> 33
+    h = (h * 0xFF51AFD7ED558CCD) & MASK64
+    h ^= h >> 33
+    h = (h * 0xC4CEB9FE1A85EC53) & MASK64
+    return h ^ (h >> 33)
+
+
+class IHasher(ABC):
+    # абстрактый класс (интерфейс) для классов реализующих хэш функции по определенному алгоритму
+    # постусловие: возвращает целое число в диапазоне [0; 2**64)
+    @abstractmethod
+    def hash_fun(self, key):
+        pass
+
+
+class IBatchHasher(IHasher):
+    # постусловие: возвращает список хэшей ключей keys в том же порядке
+    def hash_many(self, keys):
+        return [self.hash_fun(k) for k in keys]
+
+
+class SumHasher(IBatchHasher):
+    # простой класс подсчета хэша суммирующий значения отдельных символов
+    def hash_fun(self, key):
+        acc = 0
+        for c in key:
+            code = ord(c)
+            acc = acc + code
+        return acc & MASK64
+
+
+class DJB2Hasher(IBatchHasher):
+    # класс подсчета хэша по алгоритму djb2
+    def hash_fun(self, key):
+        # djb2
+        acc = 5381
+        for c in key:
+            code = ord(c)
+            acc = (((acc << 5) + acc) + code) & MASK64
+        return acc
+
+
+class PolynomialHasher(IBatchHasher):
+    # полиномиальный хэш с заданным множителем: acc = acc * multiplier + код символа
+    def __init__(self, multiplier, init=0):
+        self.__multiplier__ = multiplier
+        self.__initial__ = init
+
+    def hash_fun(self, key):
+        acc = self.__initial__
+        for c in key:
+            code = ord(c)
+            acc = (acc * self.__multiplier__ + code) & MASK64
+        return acc
+
+
+class FNV1aHasher(IBatchHasher):
+    # 64-битный FNV-1a по байтам строки в кодировке UTF-8 (bytes хэшируются как есть)
+    OFFSET_BASIS = 0xCBF29CE484222325
+    PRIME = 0x100000001B3
+
+    def hash_fun(self, key):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        acc = self.OFFSET_BASIS
+        for b in key:
+            acc = ((acc ^ b) * self.PRIME) & MASK64
+        return acc
+
+
+class MixedHasher(IBatchHasher):
+    # хэш стратегии inner, перемешанный fmix64: у близких ключей (key-1, key-2, ...)
+    # хэши djb2 и полиномиальные различаются только в младших битах, и такие ключи
+    # занимают соседние слоты, образуя длинные цепочки пробирования
+    def __init__(self, inner):
+        self.__inner__ = inner
+
+    def hash_fun(self, key):
+        return fmix64(self.__inner__.hash_fun(key))
+
+    def hash_many(self, keys):
+        if isinstance(self.__inner__, IBatchHasher):
+            return [fmix64(h) for h in self.__inner__.hash_many(keys)]
+        return [fmix64(self.__inner__.hash_fun(k)) for k in keys]
+
+
+class BuiltinHasher(IBatchHasher):
+    # встроенная hash() Python: самая быстрая, подходит для любых hashable ключей,
+    # но для str/bytes меняется от запуска к запуску (PYTHONHASHSEED),
+    # поэтому не годится для сохраняемых на диск структур
+    def hash_fun(self, key):
+        return hash(key) & MASK64
+
+    def hash_many(self, keys):
+        return [hash(k) & MASK64 for k in keys]
+
+
+class IntHasher(IBatchHasher):
+    # хэш целого числа: умножение на нечетную 64-битную константу (Фибоначчи)
+    # и свертка старших бит в младшие, без цикла по цифрам
+    MULTIPLIER = 0x9E3779B97F4A7C15
+
+    def hash_fun(self, key):
+        acc = (key * self.MULTIPLIER) & MASK64
+        return acc ^ (acc >> 32)
+
+    def hash_many(self, keys):
+        result = []
+        for key in keys:
+            acc = (key * self.MULTIPLIER) & MASK64
+            result.append(acc ^ (acc >> 32))
+        return result
+
+
+class BytesHasher(IBatchHasher):
+    # CRC-32 по всему буферу за один вызов (zlib, реализация на C);
+    # подходит для bytes, bytearray и memoryview, результат 32-битный
+    def hash_fun(self, key):
+        return zlib.crc32(key)
+
+    def hash_many(self, keys):
+        crc32 = zlib.crc32
+        return [crc32(k) for k in keys]
@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
 from abc import ABC, abstractmethod
+from array import array
+from math import gcd
+from zlib import crc32
+
+from hasher import BytesHasher, DJB2Hasher, IntHasher, MASK64, MixedHasher
 
 
 class AbstractHashTable(ABC):
@@ -26,6 +31,12 @@ class AbstractHashTable(ABC):
         """удалить значение из таблицы"""
         pass
 
+    # постусловие: удаленные слоты освобождены, значения перехэшированы
+    @abstractmethod
+    def compact(self):
+        """уплотнить таблицу"""
+        pass
+
     # ЗАПРОСЫ
     @abstractmethod
     def has(self, value):
@@ -40,54 +51,419 @@ class AbstractHashTable(ABC):
 
 
 class HashTable(AbstractHashTable):
+    # схемы пробирования
+    PROBING_LINEAR = 0  # шаг __step__, удаленные слоты помечаются __REMOVED_FLAG__
+    PROBING_ROBIN_HOOD = 1  # Robin Hood с шагом 1 и удалением обратным сдвигом, без пометок
 
-    __REMOVED_FLAG__ = 0
+    __REMOVED_FLAG__ = object()
+    # доля удаленных слотов, при превышении которой таблица перехэшируется
+    __MAX_REMOVED_LOAD__ = 0.25
+    # сколько слотов старого массива переносится за одну команду при перехэшировании
+    __MIGRATE_STEP__ = 8
 
-    def __init__(self, max_size):
-        self.__size__ = max_size
-        self.__step__ = 3
-        self.__slots__ = [None] * self.__size__
+    # КОНСТРУКТОР
+    # growable=False: таблица фиксированного размера max_size (как и раньше)
+    # growable=True: max_size - начальный (и минимальный) размер; таблица расширяется,
+    #   когда заполненность (значения + удаленные слоты) превышает max_load,
+    #   и сжимается, когда доля значений падает ниже min_load (min_load=0 - не сжимается)
+    # hasher - стратегия хэширования (IHasher), по умолчанию djb2, перемешанный fmix64
+    # probing - схема пробирования PROBING_*
+    # предусловие: 0 < max_load < 1, 0 <= min_load < max_load / 2
+    def __init__(self, max_size, growable=False, max_load=0.75, min_load=0.0, hasher=None,
+                 probing=PROBING_LINEAR):
+        self.__hasher__ = hasher if hasher is not None else MixedHasher(DJB2Hasher())
+        self.__robin_hood__ = probing == self.PROBING_ROBIN_HOOD
+        self.__step__ = 1 if self.__robin_hood__ else 3
+        self.__min_size__ = max_size
+        self.__growable__ = growable
+        self.__max_load__ = max_load
+        self.__min_load__ = min_load
+        self.__make_slots__(max_size)
+        # перехэширование выполняется постепенно: пока __old_slots__ не None,
+        # значения из него переносятся в __slots__ по __MIGRATE_STEP__ слотов за команду
+        self.__old_slots__ = None
+        self.__old_hashes__ = None
+        self.__old_count__ = 0
+        self.__migrate_pos__ = 0
+        self.__migrate_start__ = 0
         self.__add_status__ = self.ADD_STATUS_FAIL
+        self.__add_many_status__ = array('B')
+        self.__add_many_fail_count__ = 0
 
     def __hash_fun__(self, value):
-        # djb2
-        acc = 5381
-        for c in value:
-            code = ord(c)
-            acc = ((acc << 5) + acc) + code
-        return acc % self.__size__
+        return self.__hasher__.hash_fun(value)
 
+    # КОМАНДЫ
     def add(self, value):
-        self.__add_status__ = self.ADD_STATUS_FAIL
-        (found, slot) = self.__find__(value)
+        self.__add_status__ = self.__insert__(self.__hash_fun__(value), value)
+
+    # пакетное добавление: хэши всех значений считаются одним вызовом hash_many,
+    # растущая таблица расширяется сразу под всю пачку, перехэширование продвигается
+    # один раз на всю пачку; значение, чей начальный слот свободен, ставится в него
+    # без вызова __find__
+    # постусловие: в таблицу добавлены значения values; статус по каждому значению
+    #   (ADD_STATUS_*) доступен через get_add_many_status()
+    def add_many(self, values):
+        values = list(values)
+        hashes = self.__hash_many__(values)
+        self.__reserve__(len(values))
+        self.__migrate__(self.__MIGRATE_STEP__ * len(values))
+        slots = self.__slots__
+        table_hashes = self.__hashes__
+        old_slots = self.__old_slots__
+        old_hashes = self.__old_hashes__
+        size = self.__size__
+        find = self.__find__
+        put = self.__put__
+        (ok, fail) = (self.ADD_STATUS_OK, self.ADD_STATUS_FAIL)
+        result = []
+        for (h, v) in zip(hashes, values):
+            slot = h % size
+            if slots[slot] is None and old_slots is None:
+                found = False
+            else:
+                (found, slot) = find(slots, table_hashes, h, v)
+                if not found and old_slots is not None:
+                    (found, _) = find(old_slots, old_hashes, h, v)
+            if found:
+                result.append(ok)
+            elif slot is not None and self.__count__ + self.__old_count__ < size:
+                put(slot, h, v)
+                result.append(ok)
+            else:
+                result.append(fail)
+        statuses = array('B', result)
+        self.__add_many_status__ = statuses
+        self.__add_many_fail_count__ = statuses.count(fail)
+
+    def remove(self, value):
+        self.__delete_value__(self.__hash_fun__(value), value)
+
+    # перехэширование продвигается и условия сжатия проверяются один раз на всю пачку
+    # постусловие: в таблице отсутствуют значения values
+    def remove_many(self, values):
+        values = list(values)
+        hashes = self.__hash_many__(values)
+        self.__migrate__(self.__MIGRATE_STEP__ * len(values))
+        slots = self.__slots__
+        table_hashes = self.__hashes__
+        old_slots = self.__old_slots__
+        old_hashes = self.__old_hashes__
+        find = self.__find__
+        delete = self.__delete__
+        removed = False
+        for (h, v) in zip(hashes, values):
+            (found, slot) = find(slots, table_hashes, h, v)
+            if found:
+                delete(slots, table_hashes, slot)
+                self.__count__ -= 1
+                removed = True
+            elif old_slots is not None:
+                (found, slot) = find(old_slots, old_hashes, h, v)
+                if found:
+                    delete(old_slots, old_hashes, slot)
+                    self.__old_count__ -= 1
+                    removed = True
+        if removed:
+            self.__after_delete__()
+
+    # постусловие: в таблице нет удаленных слотов, перехэширование завершено
+    def compact(self):
+        if self.__removed__ > 0:
+            self.__rehash__(self.__size__)
+        self.__migrate__(None)
+
+    # ЗАПРОСЫ
+    def has(self, value):
+        h = self.__hash_fun__(value)
+        (found, _) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if not found and self.__old_slots__ is not None:
+            (found, _) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+        return found
+
+    # возвращает список True/False - наличие в таблице каждого из значений values;
+    # начальный слот значения проверяется на месте, __find__ вызывается, только если
+    # в нем другое значение или удаленный слот
+    def has_many(self, values):
+        values = list(values)
+        slots = self.__slots__
+        hashes = self.__hashes__
+        old_slots = self.__old_slots__
+        old_hashes = self.__old_hashes__
+        size = self.__size__
+        find = self.__find__
+        removed_flag = self.__REMOVED_FLAG__
+        result = []
+        for (h, v) in zip(self.__hash_many__(values), values):
+            slot = h % size
+            k = slots[slot]
+            if k is None:
+                found = False
+            elif k is not removed_flag and hashes[slot] == h and (k is v or k == v):
+                found = True
+            else:
+                (found, _) = find(slots, hashes, h, v)
+            if not found and old_slots is not None:
+                (found, _) = find(old_slots, old_hashes, h, v)
+            result.append(found)
+        return result
+
+    # возвращает гистограмму длин пробирования: элемент i - количество значений,
+    # найденных за i + 1 проб
+    def probe_histogram(self):
+        hist = []
+        for (slots, hashes) in ((self.__slots__, self.__hashes__),
+                                (self.__old_slots__, self.__old_hashes__)):
+            if slots is not None:
+                for k in range(len(slots)):
+                    v = slots[k]
+                    if v is not None and v is not self.__REMOVED_FLAG__:
+                        d = self.__distance__(len(slots), k, hashes[k])
+                        while len(hist) <= d:
+                            hist.append(0)
+                        hist[d] += 1
+        return hist
+
+    def get_add_status(self):
+        return self.__add_status__
+
+    # возвращает array('B') статусов ADD_STATUS_* последнего add_many() по каждому значению
+    def get_add_many_status(self):
+        return self.__add_many_status__
+
+    # возвращает количество значений, не добавленных последним add_many()
+    def get_add_many_fail_count(self):
+        return self.__add_many_fail_count__
+
+    # вспомогательные private функции
+    def __hash_many__(self, values):
+        hash_many = getattr(self.__hasher__, 'hash_many', None)
+        if hash_many is None:
+            return [self.__hasher__.hash_fun(v) for v in values]
+        return hash_many(values)
+
+    # добавляет значение с хэшем h, возвращает ADD_STATUS_*
+    def __insert__(self, h, value):
+        result = self.ADD_STATUS_FAIL
+        self.__migrate__(self.__MIGRATE_STEP__)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if not found and self.__old_slots__ is not None:
+            (found, _) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+        if not found and self.__growable__ and \
+                self.__count__ + self.__removed__ + 1 > self.__max_load__ * self.__size__:
+            self.__rehash__(self.__grown_size__())
+            (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
         if found:
-            self.__add_status__ = self.ADD_STATUS_OK
-        elif slot is not None:
-            self.__slots__[slot] = value
-            self.__add_status__ = self.ADD_STATUS_OK
+            result = self.ADD_STATUS_OK
+        elif slot is not None and self.__count__ + self.__old_count__ < self.__size__:
+            self.__put__(slot, h, value)
+            result = self.ADD_STATUS_OK
+        return result
 
-    def __find__(self, value):
-        slot = self.__hash_fun__(value)
+    # удаляет значение с хэшем h, если оно есть
+    def __delete_value__(self, h, value):
+        self.__migrate__(self.__MIGRATE_STEP__)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if found:
+            self.__delete__(self.__slots__, self.__hashes__, slot)
+            self.__count__ -= 1
+        elif self.__old_slots__ is not None:
+            (found, slot) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+            if found:
+                self.__delete__(self.__old_slots__, self.__old_hashes__, slot)
+                self.__old_count__ -= 1
+        if found:
+            self.__after_delete__()
+
+    # сжатие растущей таблицы или перехэширование при большой доле удаленных слотов
+    def __after_delete__(self):
+        if self.__old_slots__ is None:
+            if self.__growable__ and self.__size__ > self.__min_size__ and \
+                    self.__count__ < self.__min_load__ * self.__size__:
+                self.__rehash__(max(self.__min_size__, self.__size__ // 2))
+            elif self.__removed__ > self.__MAX_REMOVED_LOAD__ * self.__size__:
+                self.__rehash__(self.__size__)
+
+    # возвращает (True, слот со значением) или (False, свободный слот / None);
+    # для Robin Hood свободный слот - признак наличия места, вставка идет через __put__
+    def __find__(self, slots, hashes, h, value):
+        size = len(slots)
+        slot = h % size
         result = (False, None)
-        for i in range(self.__size__):
-            k = (slot + i * self.__step__) % self.__size__
-            v = self.__slots__[k]
-            if v is None or v == self.__REMOVED_FLAG__:
+        for i in range(size):
+            k = (slot + i * self.__step__) % size
+            v = slots[k]
+            if v is None:
+                if result[1] is None:
+                    result = (False, k)
+                break
+            elif v is self.__REMOVED_FLAG__:
+                # удаленный слот можно переиспользовать, но поиск продолжается за ним
+                if result[1] is None:
+                    result = (False, k)
+            elif self.__robin_hood__ and (k - hashes[k]) % size < i:
+                # значение в слоте ближе к своему началу цепочки, чем искомое было бы здесь,
+                # значит искомого в таблице нет
                 result = (False, k)
                 break
-            elif v == value:
+            elif hashes[k] == h and (v is value or v == value):
+                # полное сравнение только при совпадении сохраненных хэшей
                 result = (True, k)
                 break
         return result
 
-    def remove(self, value):
-        (found, slot) = self.__find__(value)
-        if found:
-            self.__slots__[slot] = self.__REMOVED_FLAG__
+    # номер пробы (с 0), на которой находится значение с хэшем h в слоте k
+    def __distance__(self, size, k, h):
+        return (k - h) * pow(self.__step__, -1, size) % size
 
-    def has(self, value):
-        (found, _) = self.__find__(value)
-        return found
+    def __put__(self, slot, h, value):
+        if self.__robin_hood__:
+            # Robin Hood: вставляемое значение занимает слот у того, кто ближе к началу
+            # своей цепочки, и дальше размещается вытесненное значение
+            size = self.__size__
+            k = h % size
+            d = 0
+            while self.__slots__[k] is not None:
+                kd = (k - self.__hashes__[k]) % size
+                if kd < d:
+                    (value, self.__slots__[k]) = (self.__slots__[k], value)
+                    (h, self.__hashes__[k]) = (self.__hashes__[k], h)
+                    d = kd
+                k = (k + 1) % size
+                d += 1
+            slot = k
+        elif self.__slots__[slot] is self.__REMOVED_FLAG__:
+            self.__removed__ -= 1
+        self.__slots__[slot] = value
+        self.__hashes__[slot] = h
+        self.__count__ += 1
 
-    def get_add_status(self):
-        return self.__add_status__
+    def __delete__(self, slots, hashes, slot):
+        if self.__robin_hood__:
+            # обратный сдвиг: последующие значения цепочки сдвигаются на слот ближе к началу
+            size = len(slots)
+            k = (slot + 1) % size
+            while slots[k] is not None and (k - hashes[k]) % size != 0:
+                slots[slot] = slots[k]
+                hashes[slot] = hashes[k]
+                slot = k
+                k = (k + 1) % size
+            slots[slot] = None
+        else:
+            slots[slot] = self.__REMOVED_FLAG__
+            if slots is self.__slots__:
+                self.__removed__ += 1
+
+    def __make_slots__(self, size):
+        # шаг пробирования должен быть взаимно прост с размером, иначе часть слотов
+        # недостижима: растущая таблица подбирает размер, фиксированная - шаг;
+        # нужен хотя бы один слот, иначе gcd(0, step) = step и подбор не закончится
+        size = max(1, size)
+        while gcd(size, self.__step__) != 1:
+            if self.__growable__:
+                size += 1
+            else:
+                self.__step__ += 1
+        self.__size__ = size
+        self.__slots__ = [None] * size
+        # полные хэши значений, параллельно __slots__
+        self.__hashes__ = [0] * size
+        self.__count__ = 0
+        self.__removed__ = 0
+
+    # расширяет растущую таблицу так, чтобы n новых значений поместились без перехэширования
+    def __reserve__(self, n):
+        if self.__growable__ and \
+                self.__count__ + self.__old_count__ + self.__removed__ + n > self.__max_load__ * self.__size__:
+            new_size = self.__size__
+            while self.__count__ + self.__old_count__ + n > self.__max_load__ * new_size:
+                new_size *= 2
+            self.__rehash__(new_size)
+
+    def __grown_size__(self):
+        # если таблица заполнена в основном удаленными слотами, достаточно
+        # перехэшировать ее в том же размере
+        new_size = self.__size__ * 2
+        if self.__count__ + self.__old_count__ + 1 <= self.__max_load__ * self.__size__ / 2:
+            new_size = self.__size__
+        return new_size
+
+    # начинает постепенный перенос значений в новый массив слотов размера new_size
+    def __rehash__(self, new_size):
+        self.__migrate__(None)
+        self.__old_slots__ = self.__slots__
+        self.__old_hashes__ = self.__hashes__
+        self.__old_count__ = self.__count__
+        self.__migrate_pos__ = 0
+        self.__make_slots__(new_size)
+        self.__start_migration__()
+
+    # перенос идет в порядке пробирования старого массива, начиная со свободного слота;
+    # если свободных слотов нет, все значения переносятся сразу
+    def __start_migration__(self):
+        if None in self.__old_slots__:
+            self.__migrate_start__ = self.__old_slots__.index(None)
+            self.__migrate__(0)
+        else:
+            self.__migrate_start__ = 0
+            self.__migrate__(None)
+
+    # переносит значения старого массива целыми цепочками (сериями занятых и удаленных
+    # слотов между свободными в порядке пробирования): не менее steps слотов (None - все).
+    # Перенесенные и удаленные слоты старого массива становятся свободными: цепочки,
+    # оставшиеся в нем, не разрываются, а поиск отсутствующего значения по уже
+    # перенесенной части сразу останавливается на свободном слоте
+    def __migrate__(self, steps):
+        if self.__old_slots__ is not None:
+            old_slots = self.__old_slots__
+            old_hashes = self.__old_hashes__
+            size = len(old_slots)
+            step = self.__step__
+            start = self.__migrate_start__
+            p = self.__migrate_pos__
+            if steps is None:
+                steps = size
+            while p < size:
+                i = (start + p * step) % size
+                v = old_slots[i]
+                if v is None and steps <= 0:
+                    break
+                if v is not None:
+                    if v is not self.__REMOVED_FLAG__:
+                        # хэш берется из сохраненного, значение заново не хэшируется
+                        h = old_hashes[i]
+                        (_, slot) = self.__find__(self.__slots__, self.__hashes__, h, v)
+                        self.__put__(slot, h, v)
+                        self.__old_count__ -= 1
+                    old_slots[i] = None
+                p += 1
+                steps -= 1
+            self.__migrate_pos__ = p
+            if self.__old_count__ == 0:
+                self.__old_slots__ = None
+                self.__old_hashes__ = None
+
+
+# HashTable для целых значений: хэш считается одним умножением, без цикла по символам
+# предусловие: значения - целые числа
+class IntHashTable(HashTable):
+
+    def __init__(self, max_size, growable=False, max_load=0.75, min_load=0.0,
+                 probing=HashTable.PROBING_LINEAR):
+        super().__init__(max_size, growable, max_load, min_load, IntHasher(), probing)
+
+    def __hash_fun__(self, value):
+        acc = (value * IntHasher.MULTIPLIER) & MASK64
+        return acc ^ (acc >> 32)
+
+
+# HashTable для значений bytes: хэш считается по всему буферу за один вызов zlib.crc32
+# предусловие: значения - bytes (или bytearray/memoryview, не изменяемые после добавления)
+class BytesHashTable(HashTable):
+
+    def __init__(self, max_size, growable=False, max_load=0.75, min_load=0.0,
+                 probing=HashTable.PROBING_LINEAR):
+        super().__init__(max_size, growable, max_load, min_load, BytesHasher(), probing)
+
+    def __hash_fun__(self, value):
+        return crc32(value)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+MinHash - сигнатура фиксированной длины для приближенной оценки
+меры Жаккара |A & B| / |A | B| между множествами (PowerSet или потоками значений).
+
+Значение хэшируется один раз стратегией IHasher, затем из хэша h получаются
+num_perm независимых хэшей h_i = (a_i * h + b_i) mod p, p = 2**31 - 1;
+i-й элемент сигнатуры - минимум h_i по всем значениям множества.
+Доля совпавших элементов двух сигнатур - оценка меры Жаккара.
+
+Если установлен numpy, хэши пачки значений и сравнение сигнатур считаются
+векторно; без numpy используется та же арифметика на чистом Python.
+Все промежуточные значения меньше 2**63, поэтому результаты совпадают.
+"""
+
+from abc import ABC, abstractmethod
+import random
+
+from hasher import FNV1aHasher, IBatchHasher
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# простое Мерсенна: a * (h mod p) + b < 2**62 + 2**31 помещается в uint64
+PRIME = (1 << 31) - 1
+
+
+class AbstractMinHash(ABC):
+
+    # KOHCTPYKTOP
+    @abstractmethod
+    # постусловие: создана пустая сигнатура из num_perm элементов
+    def __init__(self, num_perm):
+        pass
+
+    # КОМАНДЫ
+    # постусловие: значение учтено в сигнатуре
+    @abstractmethod
+    def add(self, value):
+        pass
+
+    # постусловие: все значения values учтены в сигнатуре
+    @abstractmethod
+    def add_many(self, values):
+        pass
+
+    # постусловие: сигнатура снова пустая
+    @abstractmethod
+    def clear(self):
+        pass
+
+    # ЗАПРОСЫ
+    # список из num_perm минимальных хэшей
+    @abstractmethod
+    def signature(self):
+        pass
+
+    # предусловие: other построена с теми же num_perm, seed и стратегией хэширования
+    # постусловие: возвращает оценку меры Жаккара в диапазоне [0; 1]
+    @abstractmethod
+    def jaccard(self, other):
+        pass
+
+
+class MinHash(AbstractMinHash):
+    # сколько значений пачки обрабатывается за один векторный шаг numpy
+    # (массив num_perm x __CHUNK__ целых 64-битных чисел)
+    __CHUNK__ = 4096
+
+    # KOHCTPYKTOP
+    # hasher - стратегия хэширования значений (IHasher), по умолчанию FNV-1a;
+    # seed задает коэффициенты a_i, b_i - сравнивать можно только сигнатуры с одним seed
+    def __init__(self, num_perm=128, hasher=None, seed=1):
+        self.__num_perm__ = num_perm
+        self.__hasher__ = hasher if hasher is not None else FNV1aHasher()
+        rnd = random.Random(seed)
+        self.__a__ = [rnd.randrange(1, PRIME) for _ in range(num_perm)]
+        self.__b__ = [rnd.randrange(0, PRIME) for _ in range(num_perm)]
+        if np is not None:
+            self.__np_a__ = np.array(self.__a__, dtype=np.uint64)[:, None]
+            self.__np_b__ = np.array(self.__b__, dtype=np.uint64)[:, None]
+        self.clear()
+
+    # КОМАНДЫ
+    def add(self, value):
+        h = self.__hasher__.hash_fun(value) % PRIME
+        sig = self.__signature__
+        for i in range(self.__num_perm__):
+            hi = (self.__a__[i] * h + self.__b__[i]) % PRIME
+            if hi < sig[i]:
+                sig[i] = hi
+
+    def add_many(self, values):
+        if isinstance(self.__hasher__, IBatchHasher):
+            hashes = self.__hasher__.hash_many(values)
+        else:
+            hashes = [self.__hasher__.hash_fun(v) for v in values]
+        hashes = [h % PRIME for h in hashes]
+        if not hashes:
+            return
+        if np is not None:
+            sig = np.array(self.__signature__, dtype=np.uint64)
+            for start in range(0, len(hashes), self.__CHUNK__):
+                chunk = np.array(hashes[start:start + self.__CHUNK__], dtype=np.uint64)
+                hi = (self.__np_a__ * chunk + self.__np_b__) % PRIME
+                np.minimum(sig, hi.min(axis=1), out=sig)
+            self.__signature__ = sig.tolist()
+        else:
+            sig = self.__signature__
+            for i in range(self.__num_perm__):
+                (a, b) = (self.__a__[i], self.__b__[i])
+                m = min([(a * h + b) % PRIME for h in hashes])
+                if m < sig[i]:
+                    sig[i] = m
+
+    # учитывает все элементы множества (PowerSet, FrozenPowerSet, BitsetPowerSet)
+    def add_set(self, power_set):
+        self.add_many(power_set.values())
+
+    def clear(self):
+        # PRIME больше любого h_i, поэтому означает "значений не было"
+        self.__signature__ = [PRIME] * self.__num_perm__
+
+    # ЗАПРОСЫ
+    def signature(self):
+        return list(self.__signature__)
+
+    def jaccard(self, other):
+        equal = sum(map(int.__eq__, self.__signature__, other.__signature__))
+        return equal / self.__num_perm__
+
+
+# оценки меры Жаккара для всех пар сигнатур: матрица len(sketches) x len(sketches)
+# в виде списка списков; с numpy каждая строка считается одним сравнением матрицы сигнатур
+# предусловие: все сигнатуры построены с одними num_perm, seed и стратегией хэширования
+def jaccard_matrix(sketches):
+    if np is not None and sketches:
+        sigs = np.array([s.signature() for s in sketches], dtype=np.uint64)
+        return [(sigs == row).mean(axis=1).tolist() for row in sigs]
+    return [[a.jaccard(b) for b in sketches] for a in sketches]
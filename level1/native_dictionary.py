@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 
 from abc import ABC, abstractmethod
+from array import array
+from math import gcd
+from zlib import crc32
+
+from hasher import BytesHasher, DJB2Hasher, IntHasher, MASK64, MixedHasher
 
 
 class AbstractNativeDictionary(ABC):
@@ -38,6 +43,12 @@ class AbstractNativeDictionary(ABC):
         """очистить словарь"""
         pass
 
+    # постусловие: удаленные слоты освобождены, пары перехэшированы
+    @abstractmethod
+    def compact(self):
+        """уплотнить словарь"""
+        pass
+
     # ЗАПРОСЫ
     # предусловие: ключ есть в словаре
     @abstractmethod
@@ -55,6 +66,24 @@ class AbstractNativeDictionary(ABC):
         """проверить наличие ключа в словаре"""
         pass
 
+    # предусловие: словарь не изменяется, пока идет перебор
+    @abstractmethod
+    def keys(self):
+        """генератор ключей словаря"""
+        pass
+
+    # предусловие: словарь не изменяется, пока идет перебор
+    @abstractmethod
+    def values(self):
+        """генератор значений словаря"""
+        pass
+
+    # предусловие: словарь не изменяется, пока идет перебор
+    @abstractmethod
+    def items(self):
+        """генератор пар (ключ, значение) словаря"""
+        pass
+
     # запросы статусов
     @abstractmethod
     def get_add_status(self):
@@ -73,83 +102,511 @@ class AbstractNativeDictionary(ABC):
 
 
 class NativeDictionary(AbstractNativeDictionary):
+    # схемы пробирования
+    PROBING_LINEAR = 0  # шаг __step__, удаленные слоты помечаются __REMOVED_FLAG__
+    PROBING_ROBIN_HOOD = 1  # Robin Hood с шагом 1 и удалением обратным сдвигом, без пометок
 
-    __REMOVED_FLAG__ = 0
+    __REMOVED_FLAG__ = object()
+    # доля удаленных слотов, при превышении которой словарь перехэшируется
+    __MAX_REMOVED_LOAD__ = 0.25
+    # сколько слотов старого массива переносится за одну команду при перехэшировании
+    __MIGRATE_STEP__ = 8
 
-    def __init__(self, max_size):
-        self.__size__ = max_size
-        self.__step__ = 3
-        self.__slots__ = [None] * self.__size__
-        self.__values__ = [None] * self.__size__
+    # hasher - стратегия хэширования ключей (IHasher), по умолчанию djb2, перемешанный fmix64
+    # probing - схема пробирования PROBING_*
+    def __init__(self, max_size, hasher=None, probing=PROBING_LINEAR):
+        self.__hasher__ = hasher if hasher is not None else MixedHasher(DJB2Hasher())
+        self.__robin_hood__ = probing == self.PROBING_ROBIN_HOOD
+        # хотя бы один слот: при нулевом размере gcd(0, step) = step и шаг не подобрать
+        self.__size__ = max(1, max_size)
+        # шаг пробирования должен быть взаимно прост с размером, иначе часть слотов недостижима
+        self.__step__ = 1 if self.__robin_hood__ else 3
+        while gcd(self.__size__, self.__step__) != 1:
+            self.__step__ += 1
+        self.__step_inverse__ = pow(self.__step__, -1, self.__size__)
+        # номер версии расположения пар, меняется при каждом перемещении пары по слотам;
+        # по нему перебор обнаруживает изменение словаря
+        self.__version__ = 0
+        self.__make_slots__()
+        self.__reset_stats__()
+        # перехэширование выполняется постепенно: пока __old_slots__ не None,
+        # пары из него переносятся в __slots__/__values__ по __MIGRATE_STEP__ слотов за команду
+        self.__old_slots__ = None
+        self.__old_hashes__ = None
+        self.__old_values__ = None
+        self.__old_count__ = 0
+        self.__migrate_pos__ = 0
+        self.__migrate_start__ = 0
         self.__add_status__ = self.ADD_STATUS_FAIL
         self.__remove_status__ = self.REMOVE_STATUS_FAIL
         self.__get_status__ = self.GET_STATUS_FAIL
 
     def __hash_fun__(self, value):
-        # djb2
-        acc = 5381
-        for c in value:
-            code = ord(c)
-            acc = ((acc << 5) + acc) + code
-        return acc % self.__size__
-
-    def __find__(self, value):
-        slot = self.__hash_fun__(value)
+        return self.__hasher__.hash_fun(value)
+
+    # возвращает (True, слот с ключом) или (False, свободный слот / None);
+    # для Robin Hood свободный слот - признак наличия места, вставка идет через __put__
+    def __find__(self, slots, hashes, h, value):
+        slot = h % self.__size__
         result = (False, None)
         for i in range(self.__size__):
             k = (slot + i * self.__step__) % self.__size__
-            v = self.__slots__[k]
-            if v is None or v == self.__REMOVED_FLAG__:
+            v = slots[k]
+            if v is None:
+                if result[1] is None:
+                    result = (False, k)
+                break
+            elif v is self.__REMOVED_FLAG__:
+                # удаленный слот можно переиспользовать, но поиск продолжается за ним
+                if result[1] is None:
+                    result = (False, k)
+            elif self.__robin_hood__ and (k - hashes[k]) % self.__size__ < i:
+                # ключ в слоте ближе к своему началу цепочки, чем искомый был бы здесь,
+                # значит искомого в словаре нет
                 result = (False, k)
                 break
-            elif v == value:
+            elif hashes[k] == h and (v is value or v == value):
+                # полное сравнение только при совпадении сохраненных хэшей
                 result = (True, k)
                 break
         return result
 
     # КОМАНДЫ
+    # замена значения имеющегося ключа не переносит пары и не меняет версию,
+    # поэтому допустима во время перебора keys()/values()/items()
     def add(self, key, value):
         self.__add_status__ = self.ADD_STATUS_FAIL
-        (found, slot) = self.__find__(key)
+        h = self.__hash_fun__(key)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, key)
         if found:
             self.__values__[slot] = value
             self.__add_status__ = self.ADD_STATUS_OK
-        elif slot is not None:
-            self.__slots__[slot] = key
-            self.__values__[slot] = value
+        elif self.__old_slots__ is not None:
+            (found, old_slot) = self.__find__(self.__old_slots__, self.__old_hashes__, h, key)
+            if found:
+                self.__old_values__[old_slot] = value
+                self.__add_status__ = self.ADD_STATUS_OK
+            else:
+                # перенос меняет новый массив, свободный слот ищется заново
+                self.__migrate__(self.__MIGRATE_STEP__)
+                (_, slot) = self.__find__(self.__slots__, self.__hashes__, h, key)
+        if not found and slot is not None and self.__count__ + self.__old_count__ < self.__size__:
+            self.__put__(slot, h, key, value)
             self.__add_status__ = self.ADD_STATUS_OK
 
     def remove(self, key):
         self.__remove_status__ = self.REMOVE_STATUS_FAIL
-        (found, slot) = self.__find__(key)
+        self.__migrate__(self.__MIGRATE_STEP__)
+        h = self.__hash_fun__(key)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, key)
         if found:
-            self.__slots__[slot] = self.__REMOVED_FLAG__
-            self.__values__[slot] = None
+            self.__delete__(self.__slots__, self.__hashes__, self.__values__, slot)
+            self.__count__ -= 1
             self.__remove_status__ = self.REMOVE_STATUS_OK
+        elif self.__old_slots__ is not None:
+            (found, slot) = self.__find__(self.__old_slots__, self.__old_hashes__, h, key)
+            if found:
+                self.__delete__(self.__old_slots__, self.__old_hashes__, self.__old_values__, slot)
+                self.__old_count__ -= 1
+                self.__remove_status__ = self.REMOVE_STATUS_OK
+        if self.__old_slots__ is None and \
+                self.__removed__ > self.__MAX_REMOVED_LOAD__ * self.__size__:
+            self.__rehash__()
 
     def clear(self):
+        self.__make_slots__()
+        self.__reset_stats__()
+        self.__old_slots__ = None
+        self.__old_hashes__ = None
+        self.__old_values__ = None
+        self.__old_count__ = 0
+
+    # постусловие: в словаре нет удаленных слотов, перехэширование завершено
+    def compact(self):
+        if self.__removed__ > 0:
+            self.__rehash__()
+        self.__migrate__(None)
+
+    # ЗАПРОСЫ
+    def get(self, key):
+        self.__get_status__ = self.GET_STATUS_FAIL
+        h = self.__hash_fun__(key)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, key)
+        values = self.__values__
+        if not found and self.__old_slots__ is not None:
+            (found, slot) = self.__find__(self.__old_slots__, self.__old_hashes__, h, key)
+            values = self.__old_values__
+        result = None
+        if found:
+            self.__get_status__ = self.GET_STATUS_OK
+            result = values[slot]
+        return result
+
+    def size(self):
+        return self.__count__ + self.__old_count__
+
+    def has_key(self, key):
+        h = self.__hash_fun__(key)
+        (found, _) = self.__find__(self.__slots__, self.__hashes__, h, key)
+        if not found and self.__old_slots__ is not None:
+            (found, _) = self.__find__(self.__old_slots__, self.__old_hashes__, h, key)
+        return found
+
+    # перебор идет лениво по массивам слотов; при изменении словаря во время
+    # перебора генератор выбрасывает RuntimeError
+    def keys(self):
+        return (key for (key, _) in self.__iterate__())
+
+    def values(self):
+        return (value for (_, value) in self.__iterate__())
+
+    def items(self):
+        return self.__iterate__()
+
+    # возвращает гистограмму длин пробирования: элемент i - количество ключей,
+    # найденных за i + 1 проб
+    def probe_histogram(self):
+        return self.__probe_hist__[:self.__max_probe__ + 1] if self.size() > 0 else []
+
+    # возвращает статистику словаря (поддерживается при каждой команде, запрос за O(1)):
+    #   size - количество пар, removed - количество удаленных слотов,
+    #   load_factor - доля слотов, занятых парами,
+    #   avg_probe, max_probe - средняя и максимальная длина пробирования имеющихся ключей,
+    #   rehashes - количество выполненных перехэширований
+    def stats(self):
+        count = self.size()
+        return {
+            'size': count,
+            'removed': self.__removed__,
+            'load_factor': count / self.__size__,
+            'avg_probe': self.__probe_total__ / count if count > 0 else 0.0,
+            'max_probe': self.__max_probe__ + 1 if count > 0 else 0,
+            'rehashes': self.__rehashes__,
+        }
+
+    # запросы статусов
+    def get_add_status(self):
+        return self.__add_status__
+
+    def get_remove_status(self):
+        return self.__remove_status__
+
+    def get_get_status(self):
+        return self.__get_status__
+
+    # вспомогательные private функции
+    # номер пробы (с 0), на которой находится ключ с хэшем h в слоте k
+    def __distance__(self, k, h):
+        return (k - h) * self.__step_inverse__ % self.__size__
+
+    def __reset_stats__(self):
+        # __probe_hist__[d] - количество ключей на d-й пробе от начала цепочки
+        self.__probe_hist__ = [0]
+        self.__probe_total__ = 0
+        self.__max_probe__ = 0
+        self.__rehashes__ = 0
+
+    # учитывает в статистике delta ключей на d-й пробе
+    def __track__(self, d, delta):
+        hist = self.__probe_hist__
+        while len(hist) <= d:
+            hist.append(0)
+        hist[d] += delta
+        self.__probe_total__ += (d + 1) * delta
+        if d > self.__max_probe__ and delta > 0:
+            self.__max_probe__ = d
+        while self.__max_probe__ > 0 and hist[self.__max_probe__] == 0:
+            self.__max_probe__ -= 1
+
+    def __iterate__(self):
+        version = self.__version__
+        for (slots, values) in ((self.__slots__, self.__values__),
+                                (self.__old_slots__, self.__old_values__)):
+            if slots is not None:
+                for k in range(self.__size__):
+                    if self.__version__ != version:
+                        raise RuntimeError('NativeDictionary changed during iteration')
+                    key = slots[k]
+                    if key is not None and key is not self.__REMOVED_FLAG__:
+                        yield (key, values[k])
+
+    def __put__(self, slot, h, key, value):
+        self.__version__ += 1
+        if self.__robin_hood__:
+            # Robin Hood: вставляемая пара занимает слот у той, что ближе к началу
+            # своей цепочки, и дальше размещается вытесненная пара
+            size = self.__size__
+            k = h % size
+            d = 0
+            while self.__slots__[k] is not None:
+                kd = (k - self.__hashes__[k]) % size
+                if kd < d:
+                    (key, self.__slots__[k]) = (self.__slots__[k], key)
+                    (h, self.__hashes__[k]) = (self.__hashes__[k], h)
+                    (value, self.__values__[k]) = (self.__values__[k], value)
+                    self.__track__(d, 1)
+                    self.__track__(kd, -1)
+                    d = kd
+                k = (k + 1) % size
+                d += 1
+            slot = k
+            self.__track__(d, 1)
+        else:
+            if self.__slots__[slot] is self.__REMOVED_FLAG__:
+                self.__removed__ -= 1
+            self.__track__(self.__distance__(slot, h), 1)
+        self.__slots__[slot] = key
+        self.__hashes__[slot] = h
+        self.__values__[slot] = value
+        self.__count__ += 1
+
+    def __delete__(self, slots, hashes, values, slot):
+        self.__version__ += 1
+        self.__track__(self.__distance__(slot, hashes[slot]), -1)
+        if self.__robin_hood__:
+            # обратный сдвиг: последующие пары цепочки сдвигаются на слот ближе к началу
+            size = self.__size__
+            k = (slot + 1) % size
+            while slots[k] is not None and (k - hashes[k]) % size != 0:
+                kd = (k - hashes[k]) % size
+                self.__track__(kd, -1)
+                self.__track__(kd - 1, 1)
+                slots[slot] = slots[k]
+                hashes[slot] = hashes[k]
+                values[slot] = values[k]
+                slot = k
+                k = (k + 1) % size
+            slots[slot] = None
+        else:
+            slots[slot] = self.__REMOVED_FLAG__
+            if slots is self.__slots__:
+                self.__removed__ += 1
+        values[slot] = None
+
+    def __make_slots__(self):
+        self.__version__ += 1
         self.__slots__ = [None] * self.__size__
+        # полные хэши ключей, параллельно __slots__
+        self.__hashes__ = [0] * self.__size__
         self.__values__ = [None] * self.__size__
+        self.__count__ = 0
+        self.__removed__ = 0
+
+    # начинает постепенный перенос пар в новые массивы слотов
+    def __rehash__(self):
+        self.__migrate__(None)
+        self.__rehashes__ += 1
+        self.__old_slots__ = self.__slots__
+        self.__old_hashes__ = self.__hashes__
+        self.__old_values__ = self.__values__
+        self.__old_count__ = self.__count__
+        self.__migrate_pos__ = 0
+        self.__make_slots__()
+        self.__start_migration__()
+
+    # перенос идет в порядке пробирования старого массива, начиная со свободного слота;
+    # если свободных слотов нет, все пары переносятся сразу
+    def __start_migration__(self):
+        if None in self.__old_slots__:
+            self.__migrate_start__ = self.__old_slots__.index(None)
+            self.__migrate__(0)
+        else:
+            self.__migrate_start__ = 0
+            self.__migrate__(None)
+
+    # переносит пары старого массива целыми цепочками (сериями занятых и удаленных
+    # слотов между свободными в порядке пробирования): не менее steps слотов (None - все).
+    # Перенесенные и удаленные слоты старого массива становятся свободными: цепочки,
+    # оставшиеся в нем, не разрываются, а поиск отсутствующего ключа по уже
+    # перенесенной части сразу останавливается на свободном слоте
+    def __migrate__(self, steps):
+        if self.__old_slots__ is not None:
+            old_slots = self.__old_slots__
+            old_hashes = self.__old_hashes__
+            old_values = self.__old_values__
+            size = len(old_slots)
+            step = self.__step__
+            start = self.__migrate_start__
+            p = self.__migrate_pos__
+            if steps is None:
+                steps = size
+            while p < size:
+                i = (start + p * step) % size
+                k = old_slots[i]
+                if k is None and steps <= 0:
+                    break
+                if k is not None:
+                    if k is not self.__REMOVED_FLAG__:
+                        # хэш берется из сохраненного, ключ заново не хэшируется
+                        h = old_hashes[i]
+                        self.__track__(self.__distance__(i, h), -1)
+                        (_, slot) = self.__find__(self.__slots__, self.__hashes__, h, k)
+                        self.__put__(slot, h, k, old_values[i])
+                        old_values[i] = None
+                        self.__old_count__ -= 1
+                    old_slots[i] = None
+                p += 1
+                steps -= 1
+            self.__migrate_pos__ = p
+            if self.__old_count__ == 0:
+                self.__old_slots__ = None
+                self.__old_hashes__ = None
+                self.__old_values__ = None
+
+
+# NativeDictionary для целых ключей: хэш считается одним умножением, без цикла по символам
+# предусловие: ключи - целые числа
+class IntNativeDictionary(NativeDictionary):
+
+    def __init__(self, max_size, probing=NativeDictionary.PROBING_LINEAR):
+        super().__init__(max_size, IntHasher(), probing)
+
+    def __hash_fun__(self, value):
+        acc = (value * IntHasher.MULTIPLIER) & MASK64
+        return acc ^ (acc >> 32)
+
+
+# NativeDictionary для ключей bytes: хэш считается по всему буферу за один вызов zlib.crc32
+# предусловие: ключи - bytes (или bytearray/memoryview, не изменяемые после добавления)
+class BytesNativeDictionary(NativeDictionary):
+
+    def __init__(self, max_size, probing=NativeDictionary.PROBING_LINEAR):
+        super().__init__(max_size, BytesHasher(), probing)
+
+    def __hash_fun__(self, value):
+        return crc32(value)
+
+
+# Компактное представление словаря (по аналогии с dict в CPython 3.6+):
+# массив слотов хранит не пары, а небольшие целые - номера записей в плотных
+# массивах ключей, хэшей и значений, которые заполняются по порядку добавления.
+# Тип элементов массива слотов выбирается самый узкий, вмещающий max_size,
+# поэтому пустой слот стоит 1-4 байта вместо трех ссылок, а перебор
+# идет в порядке добавления пар.
+class CompactNativeDictionary(AbstractNativeDictionary):
+
+    __EMPTY__ = -1  # слот свободен
+    __DUMMY__ = -2  # пара из слота удалена
+    __REMOVED_FLAG__ = object()
+    # доля удаленных пар, при превышении которой массивы уплотняются
+    __MAX_REMOVED_LOAD__ = 0.25
+
+    # hasher - стратегия хэширования ключей (IHasher), по умолчанию djb2
+    def __init__(self, max_size, hasher=None):
+        self.__hasher__ = hasher if hasher is not None else DJB2Hasher()
+        # хотя бы один слот: при нулевом размере gcd(0, step) = step и шаг не подобрать
+        self.__size__ = max(1, max_size)
+        # шаг пробирования должен быть взаимно прост с размером, иначе часть слотов недостижима
+        self.__step__ = 3
+        while gcd(self.__size__, self.__step__) != 1:
+            self.__step__ += 1
+        self.__typecode__ = 'q'
+        for typecode in ('b', 'h', 'i'):
+            if max_size <= 2 ** (8 * array(typecode).itemsize - 1) - 1:
+                self.__typecode__ = typecode
+                break
+        self.__version__ = 0
+        self.__make_slots__()
+        self.__add_status__ = self.ADD_STATUS_FAIL
+        self.__remove_status__ = self.REMOVE_STATUS_FAIL
+        self.__get_status__ = self.GET_STATUS_FAIL
+
+    def __hash_fun__(self, value):
+        return self.__hasher__.hash_fun(value)
+
+    # возвращает (True, слот с ключом) или (False, первый пустой слот / None);
+    # слоты удаленных пар не переиспользуются до уплотнения
+    def __find__(self, h, key):
+        indices = self.__indices__
+        slot = h % self.__size__
+        result = (False, None)
+        for i in range(self.__size__):
+            k = (slot + i * self.__step__) % self.__size__
+            ix = indices[k]
+            if ix == self.__EMPTY__:
+                result = (False, k)
+                break
+            elif ix != self.__DUMMY__ and self.__hashes__[ix] == h:
+                v = self.__keys__[ix]
+                if v is key or v == key:
+                    result = (True, k)
+                    break
+        return result
+
+    # КОМАНДЫ
+    def add(self, key, value):
+        self.__add_status__ = self.ADD_STATUS_FAIL
+        h = self.__hash_fun__(key)
+        (found, slot) = self.__find__(h, key)
+        if found:
+            self.__values__[self.__indices__[slot]] = value
+            self.__add_status__ = self.ADD_STATUS_OK
+        elif self.__count__ < self.__size__:
+            if slot is None:
+                # пустых слотов нет, остались только слоты удаленных пар
+                self.compact()
+                (_, slot) = self.__find__(h, key)
+            self.__put__(slot, h, key, value)
+            self.__add_status__ = self.ADD_STATUS_OK
+
+    def remove(self, key):
+        self.__remove_status__ = self.REMOVE_STATUS_FAIL
+        (found, slot) = self.__find__(self.__hash_fun__(key), key)
+        if found:
+            ix = self.__indices__[slot]
+            self.__indices__[slot] = self.__DUMMY__
+            self.__keys__[ix] = self.__REMOVED_FLAG__
+            self.__values__[ix] = None
+            self.__count__ -= 1
+            self.__removed__ += 1
+            self.__version__ += 1
+            self.__remove_status__ = self.REMOVE_STATUS_OK
+            if self.__removed__ > self.__MAX_REMOVED_LOAD__ * self.__size__:
+                self.compact()
+
+    def clear(self):
+        self.__make_slots__()
+
+    # постусловие: удаленные пары убраны из плотных массивов, слоты перестроены
+    def compact(self):
+        if self.__removed__ > 0:
+            keys = self.__keys__
+            hashes = self.__hashes__
+            values = self.__values__
+            self.__make_slots__()
+            for i in range(len(keys)):
+                if keys[i] is not self.__REMOVED_FLAG__:
+                    (_, slot) = self.__find__(hashes[i], keys[i])
+                    self.__put__(slot, hashes[i], keys[i], values[i])
 
     # ЗАПРОСЫ
     def get(self, key):
         self.__get_status__ = self.GET_STATUS_FAIL
-        (found, slot) = self.__find__(key)
+        (found, slot) = self.__find__(self.__hash_fun__(key), key)
         result = None
         if found:
             self.__get_status__ = self.GET_STATUS_OK
-            result = self.__values__[slot]
+            result = self.__values__[self.__indices__[slot]]
         return result
 
     def size(self):
-        def is_filled(slot):
-            return slot is not None and slot != self.__REMOVED_FLAG__
-        return sum(is_filled(s) for s in self.__slots__)
+        return self.__count__
 
     def has_key(self, key):
-        (found, _) = self.__find__(key)
+        (found, _) = self.__find__(self.__hash_fun__(key), key)
         return found
 
+    # перебор идет лениво в порядке добавления пар; при изменении словаря во время
+    # перебора генератор выбрасывает RuntimeError
+    def keys(self):
+        return (key for (key, _) in self.__iterate__())
+
+    def values(self):
+        return (value for (_, value) in self.__iterate__())
+
+    def items(self):
+        return self.__iterate__()
+
     # запросы статусов
     def get_add_status(self):
         return self.__add_status__
@@ -159,3 +616,32 @@ class NativeDictionary(AbstractNativeDictionary):
 
     def get_get_status(self):
         return self.__get_status__
+
+    # вспомогательные private функции
+    def __iterate__(self):
+        version = self.__version__
+        keys = self.__keys__
+        values = self.__values__
+        for i in range(len(keys)):
+            if self.__version__ != version:
+                raise RuntimeError('CompactNativeDictionary changed during iteration')
+            if keys[i] is not self.__REMOVED_FLAG__:
+                yield (keys[i], values[i])
+
+    def __put__(self, slot, h, key, value):
+        self.__indices__[slot] = len(self.__keys__)
+        self.__keys__.append(key)
+        self.__hashes__.append(h)
+        self.__values__.append(value)
+        self.__count__ += 1
+        self.__version__ += 1
+
+    def __make_slots__(self):
+        self.__indices__ = array(self.__typecode__, [self.__EMPTY__]) * self.__size__
+        # плотные массивы записей в порядке добавления
+        self.__keys__ = []
+        self.__hashes__ = array('Q')
+        self.__values__ = []
+        self.__count__ = 0
+        self.__removed__ = 0
+        self.__version__ += 1
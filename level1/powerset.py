@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 
 from abc import ABC, abstractmethod
+from array import array
+from math import gcd
+import os
+import sys
+
+from hasher import DJB2Hasher, IntHasher, MASK64, MixedHasher
+from native_dictionary import NativeDictionary
 
 # AbstractHashTable без изменений из hashtable.py
 class AbstractHashTable(ABC):
@@ -27,6 +34,12 @@ class AbstractHashTable(ABC):
         """удалить значение из таблицы"""
         pass
 
+    # постусловие: удаленные слоты освобождены, значения перехэшированы
+    @abstractmethod
+    def compact(self):
+        """уплотнить таблицу"""
+        pass
+
     # ЗАПРОСЫ
     @abstractmethod
     def has(self, value):
@@ -48,6 +61,12 @@ class AbstractPowerSet(AbstractHashTable):
     UNION_STATUS_FAIL = 1
     DIFFERENCE_STATUS_OK = 0
     DIFFERENCE_STATUS_FAIL = 1
+    INTERSECTION_UPDATE_STATUS_OK = 0
+    INTERSECTION_UPDATE_STATUS_FAIL = 1
+    UNION_UPDATE_STATUS_OK = 0
+    UNION_UPDATE_STATUS_FAIL = 1  # элементы other_set не помещаются, множество не изменено
+    DIFFERENCE_UPDATE_STATUS_OK = 0
+    DIFFERENCE_UPDATE_STATUS_FAIL = 1
 
     # KOHCTPYKTOP
     # постусловие: создано множество под фиксированное количество значений
@@ -55,11 +74,29 @@ class AbstractPowerSet(AbstractHashTable):
         pass
 
     # КОМАНДЫ
+    # постусловие: в текущем множестве остались только элементы, имеющиеся в other_set
+    @abstractmethod
+    def intersection_update(self, other_set):
+        """пересечь текущее множество с other_set на месте"""
+        pass
+
+    # предусловие: все элементы other_set помещаются в текущее множество
+    # постусловие: в текущее множество добавлены элементы other_set
+    @abstractmethod
+    def union_update(self, other_set):
+        """объединить текущее множество с other_set на месте"""
+        pass
+
+    # постусловие: из текущего множества удалены элементы, имеющиеся в other_set
+    @abstractmethod
+    def difference_update(self, other_set):
+        """вычесть other_set из текущего множества на месте"""
+        pass
 
     # ЗАПРОСЫ
     @abstractmethod
     def values(self):
-        """возвращает элементы в множестве в виде списка"""
+        """возвращает элементы в множестве в виде последовательности только для чтения (tuple)"""
         pass
 
     @abstractmethod
@@ -106,126 +143,225 @@ class AbstractPowerSet(AbstractHashTable):
         """возвращает DIFFERENCE_STATUS_*"""
         pass
 
+    @abstractmethod
+    def get_intersection_update_status(self):
+        """возвращает INTERSECTION_UPDATE_STATUS_*"""
+        pass
+
+    @abstractmethod
+    def get_union_update_status(self):
+        """возвращает UNION_UPDATE_STATUS_*"""
+        pass
+
+    @abstractmethod
+    def get_difference_update_status(self):
+        """возвращает DIFFERENCE_UPDATE_STATUS_*"""
+        pass
+
 
 class PowerSet(AbstractPowerSet):
-    __REMOVED_FLAG__ = 0
+    # схемы пробирования
+    PROBING_LINEAR = 0  # шаг __step__, удаленные слоты помечаются __REMOVED_FLAG__
+    PROBING_ROBIN_HOOD = 1  # Robin Hood с шагом 1 и удалением обратным сдвигом, без пометок
+
+    __REMOVED_FLAG__ = object()
+    # доля удаленных слотов, при превышении которой множество перехэшируется
+    __MAX_REMOVED_LOAD__ = 0.25
+    # сколько слотов старого массива переносится за одну команду при перехэшировании
+    __MIGRATE_STEP__ = 8
+    # общая стратегия хэширования по умолчанию: множества с одной и той же стратегией
+    # могут использовать сохраненные хэши друг друга в операциях над множествами
+    # (стратегии сравниваются по идентичности, поэтому экземпляр один на все множества)
+    __DEFAULT_HASHER__ = MixedHasher(DJB2Hasher())
 
     # KOHCTPYKTOP
-    def __init__(self, max_size):
-        self.__size__ = max_size
-        self.__step__ = 3
-        self.__slots__ = [None] * self.__size__
+    # hasher - стратегия хэширования (IHasher), по умолчанию djb2, перемешанный fmix64
+    # probing - схема пробирования PROBING_*
+    def __init__(self, max_size, hasher=None, probing=PROBING_LINEAR):
+        self.__hasher__ = hasher if hasher is not None else self.__DEFAULT_HASHER__
+        self.__probing__ = probing
+        self.__robin_hood__ = probing == self.PROBING_ROBIN_HOOD
+        # хотя бы один слот: при нулевом размере gcd(0, step) = step и шаг не подобрать
+        self.__size__ = max(1, max_size)
+        # шаг пробирования должен быть взаимно прост с размером, иначе часть слотов недостижима
+        self.__step__ = 1 if self.__robin_hood__ else 3
+        while gcd(self.__size__, self.__step__) != 1:
+            self.__step__ += 1
+        # номер поколения содержимого, меняется при каждом перемещении значения по слотам;
+        # снимок values() перестраивается, только если поколение сменилось
+        self.__generation__ = 0
+        self.__values_cache__ = None
+        self.__values_generation__ = -1
+        self.__make_slots__()
+        # перехэширование выполняется постепенно: пока __old_slots__ не None,
+        # значения из него переносятся в __slots__ по __MIGRATE_STEP__ слотов за команду
+        self.__old_slots__ = None
+        self.__old_hashes__ = None
+        self.__old_count__ = 0
+        self.__migrate_pos__ = 0
+        self.__migrate_start__ = 0
         self.__add_status__ = self.ADD_STATUS_FAIL
         self.__intersection_status__ = self.INTERSECTION_STATUS_FAIL
         self.__union_status__ = self.UNION_STATUS_FAIL
         self.__difference_status__ = self.DIFFERENCE_STATUS_FAIL
+        self.__intersection_update_status__ = self.INTERSECTION_UPDATE_STATUS_FAIL
+        self.__union_update_status__ = self.UNION_UPDATE_STATUS_FAIL
+        self.__difference_update_status__ = self.DIFFERENCE_UPDATE_STATUS_FAIL
 
     def __hash_fun__(self, value):
-        # djb2
-        acc = 5381
-        for c in value:
-            code = ord(c)
-            acc = ((acc << 5) + acc) + code
-        return acc % self.__size__
+        return self.__hasher__.hash_fun(value)
 
     # КОМАНДЫ
     def add(self, value):
-        self.__add_status__ = self.ADD_STATUS_FAIL
-        (found, slot) = self.__find__(value)
-        if found:
-            self.__add_status__ = self.ADD_STATUS_OK
-        elif slot is not None:
-            self.__slots__[slot] = value
-            self.__add_status__ = self.ADD_STATUS_OK
+        self.__add_status__ = self.__insert__(self.__hash_fun__(value), value)
 
-    def __find__(self, value):
-        slot = self.__hash_fun__(value)
+    # возвращает (True, слот со значением) или (False, свободный слот / None);
+    # для Robin Hood свободный слот - признак наличия места, вставка идет через __put__
+    def __find__(self, slots, hashes, h, value):
+        slot = h % self.__size__
         result = (False, None)
         for i in range(self.__size__):
             k = (slot + i * self.__step__) % self.__size__
-            v = self.__slots__[k]
-            if v is None or v == self.__REMOVED_FLAG__:
+            v = slots[k]
+            if v is None:
+                if result[1] is None:
+                    result = (False, k)
+                break
+            elif v is self.__REMOVED_FLAG__:
+                # удаленный слот можно переиспользовать, но поиск продолжается за ним
+                if result[1] is None:
+                    result = (False, k)
+            elif self.__robin_hood__ and (k - hashes[k]) % self.__size__ < i:
+                # значение в слоте ближе к своему началу цепочки, чем искомое было бы здесь,
+                # значит искомого в множестве нет
                 result = (False, k)
                 break
-            elif v == value:
+            elif hashes[k] == h and (v is value or v == value):
+                # полное сравнение только при совпадении сохраненных хэшей
                 result = (True, k)
                 break
         return result
 
     def remove(self, value):
-        (found, slot) = self.__find__(value)
-        if found:
-            self.__slots__[slot] = self.__REMOVED_FLAG__
+        self.__delete_value__(self.__hash_fun__(value), value)
+
+    # изменяемые на месте варианты операций: элементы переносятся вместе с хэшами,
+    # при поиске перебирается меньшее из множеств
+    def intersection_update(self, other_set):
+        removed = [(v, h) for (v, h) in self.__entries__()
+                   if not self.__has_in__(other_set, h, v)]
+        for (v, h) in removed:
+            self.__delete_value__(h, v)
+        self.__intersection_update_status__ = self.INTERSECTION_UPDATE_STATUS_OK
+
+    def union_update(self, other_set):
+        self.__union_update_status__ = self.UNION_UPDATE_STATUS_FAIL
+        added = [(v, h) for (v, h) in self.__entries_of__(other_set)
+                 if not self.__has_hashed__(h, v)]
+        if self.__cardinality__(self) + len(added) <= self.__size__:
+            for (v, h) in added:
+                self.__insert__(h, v)
+            self.__union_update_status__ = self.UNION_UPDATE_STATUS_OK
+
+    def difference_update(self, other_set):
+        if self.__cardinality__(other_set) < self.__cardinality__(self):
+            for (v, h) in list(self.__entries_of__(other_set)):
+                self.__delete_value__(h, v)
+        else:
+            removed = [(v, h) for (v, h) in self.__entries__()
+                       if self.__has_in__(other_set, h, v)]
+            for (v, h) in removed:
+                self.__delete_value__(h, v)
+        self.__difference_update_status__ = self.DIFFERENCE_UPDATE_STATUS_OK
+
+    # постусловие: в множестве нет удаленных слотов, перехэширование завершено
+    def compact(self):
+        if self.__removed__ > 0:
+            self.__rehash__()
+        self.__migrate__(None)
 
     # ЗАПРОСЫ
     def has(self, value):
-        (found, _) = self.__find__(value)
-        return found
+        return self.__has_hashed__(self.__hash_fun__(value), value)
 
     def get_add_status(self):
         return self.__add_status__
 
+    # возвращает гистограмму длин пробирования: элемент i - количество значений,
+    # найденных за i + 1 проб
+    def probe_histogram(self):
+        hist = []
+        for (slots, hashes) in ((self.__slots__, self.__hashes__),
+                                (self.__old_slots__, self.__old_hashes__)):
+            if slots is not None:
+                for k in range(self.__size__):
+                    v = slots[k]
+                    if v is not None and v is not self.__REMOVED_FLAG__:
+                        d = self.__distance__(k, hashes[k])
+                        while len(hist) <= d:
+                            hist.append(0)
+                        hist[d] += 1
+        return hist
+
+    # возвращается неизменяемый снимок (tuple): до следующего изменения множества
+    # повторные вызовы отдают тот же кортеж без повторного просмотра слотов
     def values(self):
-        elems = []
-        for i in range(self.__size__):
-            v = self.__slots__[i]
-            if v is not None and v != self.__REMOVED_FLAG__:
-                elems.append(v)
-        return elems
+        if self.__values_generation__ != self.__generation__:
+            elems = []
+            for slots in (self.__slots__, self.__old_slots__):
+                if slots is not None:
+                    for v in slots:
+                        if v is not None and v is not self.__REMOVED_FLAG__:
+                            elems.append(v)
+            self.__values_cache__ = tuple(elems)
+            self.__values_generation__ = self.__generation__
+        return self.__values_cache__
 
     def size(self):
-        return len(self.values())
+        return self.__count__ + self.__old_count__
 
+    # результаты операций создаются под фактическое количество элементов
+    # (с запасом до заполненности 3/4), поэтому не переполняются;
+    # при поиске перебирается меньшее из множеств
     def intersection(self, other_set):
         self.__intersection_status__ = self.INTERSECTION_STATUS_OK
-        s = PowerSet(self.__size__)
-        elems = self.values()
-        for e in elems:
-            if other_set.has(e):
-                s.add(e)
-                if self.get_add_status() != self.ADD_STATUS_OK:
-                    self.__intersection_status__ = self.INTERSECTION_STATUS_FAIL
-                    break
+        (small, large) = (self, other_set)
+        if self.__cardinality__(other_set) < self.__cardinality__(self):
+            (small, large) = (other_set, self)
+        s = self.__result_set__(self.__cardinality__(small))
+        for (v, h) in self.__entries_of__(small):
+            if self.__has_in__(large, h, v):
+                s.__put_new__(h, v)
         return s
 
     def union(self, other_set):
         self.__union_status__ = self.UNION_STATUS_OK
-        s = PowerSet(self.__size__)
-        elems = self.values()
-        for e in elems:
-            s.add(e)
-            if self.get_add_status() != self.ADD_STATUS_OK:
-                self.__union_status__ = self.UNION_STATUS_FAIL
-                break
-        elems = other_set.values()
-        for e in elems:
-            s.add(e)
-            if self.get_add_status() != self.ADD_STATUS_OK:
-                self.__union_status__ = self.UNION_STATUS_FAIL
-                break
+        (small, large) = (self, other_set)
+        if self.__cardinality__(other_set) < self.__cardinality__(self):
+            (small, large) = (other_set, self)
+        s = self.__result_set__(self.__cardinality__(small) + self.__cardinality__(large))
+        for (v, h) in self.__entries_of__(large):
+            s.__put_new__(h, v)
+        for (v, h) in self.__entries_of__(small):
+            if not s.__has_hashed__(h, v):
+                s.__put_new__(h, v)
         return s
 
     def difference(self, other_set):
         self.__difference_status__ = self.DIFFERENCE_STATUS_OK
-        s = PowerSet(self.__size__)
-        elems = self.values()
-        for e in elems:
-            s.add(e)
-            if self.get_add_status() != self.ADD_STATUS_OK:
-                self.__difference_status__ = self.DIFFERENCE_STATUS_FAIL
-                break
-        elems = other_set.values()
-        for e in elems:
-            s.remove(e)
+        s = self.__result_set__(self.__cardinality__(self))
+        for (v, h) in self.__entries__():
+            if not self.__has_in__(other_set, h, v):
+                s.__put_new__(h, v)
         return s
 
     def issubset(self, other_set):
-        elems = other_set.values()
-        result = True
-        for e in elems:
-            if not self.has(e):
-                result = False
-                break
+        result = self.__cardinality__(other_set) <= self.__cardinality__(self)
+        if result:
+            for (v, h) in self.__entries_of__(other_set):
+                if not self.__has_hashed__(h, v):
+                    result = False
+                    break
         return result
 
     # запросы статусов
@@ -237,3 +373,669 @@ class PowerSet(AbstractPowerSet):
 
     def get_difference_status(self):
         return self.__difference_status__
+
+    def get_intersection_update_status(self):
+        return self.__intersection_update_status__
+
+    def get_union_update_status(self):
+        return self.__union_update_status__
+
+    def get_difference_update_status(self):
+        return self.__difference_update_status__
+
+    # вспомогательные private функции
+    # добавляет значение с хэшем h, возвращает ADD_STATUS_*
+    def __insert__(self, h, value):
+        result = self.ADD_STATUS_FAIL
+        self.__migrate__(self.__MIGRATE_STEP__)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if not found and self.__old_slots__ is not None:
+            (found, _) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+        if found:
+            result = self.ADD_STATUS_OK
+        elif slot is not None and self.__count__ + self.__old_count__ < self.__size__:
+            self.__put__(slot, h, value)
+            result = self.ADD_STATUS_OK
+        return result
+
+    # удаляет значение с хэшем h, если оно есть
+    def __delete_value__(self, h, value):
+        self.__migrate__(self.__MIGRATE_STEP__)
+        (found, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if found:
+            self.__delete__(self.__slots__, self.__hashes__, slot)
+            self.__count__ -= 1
+        elif self.__old_slots__ is not None:
+            (found, slot) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+            if found:
+                self.__delete__(self.__old_slots__, self.__old_hashes__, slot)
+                self.__old_count__ -= 1
+        if self.__old_slots__ is None and \
+                self.__removed__ > self.__MAX_REMOVED_LOAD__ * self.__size__:
+            self.__rehash__()
+
+    def __has_hashed__(self, h, value):
+        (found, _) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        if not found and self.__old_slots__ is not None:
+            (found, _) = self.__find__(self.__old_slots__, self.__old_hashes__, h, value)
+        return found
+
+    # пары (значение, сохраненный хэш) всех элементов множества
+    def __entries__(self):
+        for (slots, hashes) in ((self.__slots__, self.__hashes__),
+                                (self.__old_slots__, self.__old_hashes__)):
+            if slots is not None:
+                for k in range(self.__size__):
+                    v = slots[k]
+                    if v is not None and v is not self.__REMOVED_FLAG__:
+                        yield (v, hashes[k])
+
+    # True, если other_set - PowerSet с той же стратегией хэширования,
+    # и его сохраненные хэши годятся для этого множества
+    def __same_hashing__(self, other_set):
+        return isinstance(other_set, PowerSet) and other_set.__hasher__ is self.__hasher__
+
+    def __cardinality__(self, other_set):
+        if isinstance(other_set, PowerSet):
+            return other_set.__count__ + other_set.__old_count__
+        return other_set.size()
+
+    def __entries_of__(self, other_set):
+        if self.__same_hashing__(other_set):
+            return other_set.__entries__()
+        return ((v, self.__hash_fun__(v)) for v in other_set.values())
+
+    def __has_in__(self, other_set, h, value):
+        if self.__same_hashing__(other_set):
+            return other_set.__has_hashed__(h, value)
+        return other_set.has(value)
+
+    # пустое множество с теми же стратегиями под count элементов
+    def __result_set__(self, count):
+        return PowerSet(count * 4 // 3 + 1, self.__hasher__, self.__probing__)
+
+    # вставка значения, которого заведомо нет в множестве, без статуса
+    # предусловие: в множестве есть свободный слот
+    def __put_new__(self, h, value):
+        (_, slot) = self.__find__(self.__slots__, self.__hashes__, h, value)
+        self.__put__(slot, h, value)
+
+    # номер пробы (с 0), на которой находится значение с хэшем h в слоте k
+    def __distance__(self, k, h):
+        return (k - h) * pow(self.__step__, -1, self.__size__) % self.__size__
+
+    def __put__(self, slot, h, value):
+        if self.__robin_hood__:
+            # Robin Hood: вставляемое значение занимает слот у того, кто ближе к началу
+            # своей цепочки, и дальше размещается вытесненное значение
+            size = self.__size__
+            k = h % size
+            d = 0
+            while self.__slots__[k] is not None:
+                kd = (k - self.__hashes__[k]) % size
+                if kd < d:
+                    (value, self.__slots__[k]) = (self.__slots__[k], value)
+                    (h, self.__hashes__[k]) = (self.__hashes__[k], h)
+                    d = kd
+                k = (k + 1) % size
+                d += 1
+            slot = k
+        elif self.__slots__[slot] is self.__REMOVED_FLAG__:
+            self.__removed__ -= 1
+        self.__slots__[slot] = value
+        self.__hashes__[slot] = h
+        self.__count__ += 1
+        self.__generation__ += 1
+
+    def __delete__(self, slots, hashes, slot):
+        if self.__robin_hood__:
+            # обратный сдвиг: последующие значения цепочки сдвигаются на слот ближе к началу
+            size = self.__size__
+            k = (slot + 1) % size
+            while slots[k] is not None and (k - hashes[k]) % size != 0:
+                slots[slot] = slots[k]
+                hashes[slot] = hashes[k]
+                slot = k
+                k = (k + 1) % size
+            slots[slot] = None
+        else:
+            slots[slot] = self.__REMOVED_FLAG__
+            if slots is self.__slots__:
+                self.__removed__ += 1
+        self.__generation__ += 1
+
+    def __make_slots__(self):
+        self.__slots__ = [None] * self.__size__
+        # полные хэши ключей, параллельно __slots__
+        self.__hashes__ = [0] * self.__size__
+        self.__count__ = 0
+        self.__removed__ = 0
+        self.__generation__ += 1
+
+    # начинает постепенный перенос значений в новый массив слотов
+    def __rehash__(self):
+        self.__migrate__(None)
+        self.__old_slots__ = self.__slots__
+        self.__old_hashes__ = self.__hashes__
+        self.__old_count__ = self.__count__
+        self.__migrate_pos__ = 0
+        self.__make_slots__()
+        self.__start_migration__()
+
+    # перенос идет в порядке пробирования старого массива, начиная со свободного слота;
+    # если свободных слотов нет, все значения переносятся сразу
+    def __start_migration__(self):
+        if None in self.__old_slots__:
+            self.__migrate_start__ = self.__old_slots__.index(None)
+            self.__migrate__(0)
+        else:
+            self.__migrate_start__ = 0
+            self.__migrate__(None)
+
+    # переносит значения старого массива целыми цепочками (сериями занятых и удаленных
+    # слотов между свободными в порядке пробирования): не менее steps слотов (None - все).
+    # Перенесенные и удаленные слоты старого массива становятся свободными: цепочки,
+    # оставшиеся в нем, не разрываются, а поиск отсутствующего значения по уже
+    # перенесенной части сразу останавливается на свободном слоте
+    def __migrate__(self, steps):
+        if self.__old_slots__ is not None:
+            old_slots = self.__old_slots__
+            old_hashes = self.__old_hashes__
+            size = len(old_slots)
+            step = self.__step__
+            start = self.__migrate_start__
+            p = self.__migrate_pos__
+            if steps is None:
+                steps = size
+            while p < size:
+                i = (start + p * step) % size
+                v = old_slots[i]
+                if v is None and steps <= 0:
+                    break
+                if v is not None:
+                    if v is not self.__REMOVED_FLAG__:
+                        # хэш берется из сохраненного, значение заново не хэшируется
+                        h = old_hashes[i]
+                        (_, slot) = self.__find__(self.__slots__, self.__hashes__, h, v)
+                        self.__put__(slot, h, v)
+                        self.__old_count__ -= 1
+                    old_slots[i] = None
+                p += 1
+                steps -= 1
+            self.__migrate_pos__ = p
+            if self.__old_count__ == 0:
+                self.__old_slots__ = None
+                self.__old_hashes__ = None
+
+
+# Пересечение нескольких PowerSet за один проход: множества перебираются
+# по возрастанию размера, кандидаты берутся из наименьшего и отсеиваются
+# остальными; как только кандидатов не осталось, перебор прекращается.
+# Промежуточные множества не создаются, результат заполняется один раз.
+# предусловие: sets - непустой список PowerSet
+def intersect_all(sets):
+    ordered = sorted(sets, key=lambda s: s.__cardinality__(s))
+    base = ordered[0]
+    candidates = list(base.__entries__())
+    for other in ordered[1:]:
+        if not candidates:
+            break
+        candidates = [(v, h) for (v, h) in candidates if base.__has_in__(other, h, v)]
+    result = base.__result_set__(len(candidates))
+    for (v, h) in candidates:
+        result.__put_new__(h, v)
+    return result
+
+
+# Объединение нескольких PowerSet: результат создается один раз под
+# суммарный размер, в него копируется наибольшее множество
+# и добавляются недостающие элементы остальных
+# предусловие: sets - непустой список PowerSet
+def union_all(sets):
+    ordered = sorted(sets, key=lambda s: s.__cardinality__(s), reverse=True)
+    base = ordered[0]
+    result = base.__result_set__(sum(s.__cardinality__(s) for s in ordered))
+    for (v, h) in base.__entries__():
+        result.__put_new__(h, v)
+    for other in ordered[1:]:
+        for (v, h) in result.__entries_of__(other):
+            if not result.__has_hashed__(h, v):
+                result.__put_new__(h, v)
+    return result
+
+
+# Параллельные варианты intersection/difference для очень больших множеств.
+# Процессы-исполнители создаются через fork и читают оба множества из общей
+# (копируемой при записи) памяти, поэтому элементы в процессы не передаются.
+# Массив слотов перебираемого множества (a, для пересечения - меньшего из двух
+# PowerSet с одними стратегиями) делится на workers диапазонов в порядке
+# пробирования; границы диапазонов - свободные слоты, так что ни одна цепочка
+# не пересекает границу. Каждый исполнитель проверяет элементы своего диапазона
+# по другому множеству и сразу раскладывает оставшиеся по слотам результата,
+# как если бы они вставлялись заново в том же порядке, и возвращает только
+# пары номеров (слот результата, слот исходного массива) в array.
+# Родитель лишь переносит значения и хэши по этим парам - без хэширования и поиска.
+# Результат имеет размер перебираемого множества.
+# workers по умолчанию - количество доступных процессу ядер; при workers <= 1, без fork
+# или без свободных слотов выполняется обычная операция.
+# multiprocessing импортируется только при вызове (__multiprocessing__).
+# предусловие: a - PowerSet
+def parallel_intersection(a, b, workers=None):
+    return __parallel_operation__(a, b, True, workers)
+
+
+def parallel_difference(a, b, workers=None):
+    return __parallel_operation__(a, b, False, workers)
+
+
+# (перебираемое множество, другое множество, keep_found, начальный слот) на время
+# вызова Pool; исполнители получают его при fork
+__parallel_state__ = None
+
+
+def __parallel_operation__(a, b, keep_found, workers):
+    global __parallel_state__
+    multiprocessing = __multiprocessing__()
+    if workers is None:
+        # ядра, доступные процессу (с учетом ограничения affinity), а не все ядра машины
+        if hasattr(os, 'sched_getaffinity'):
+            workers = len(os.sched_getaffinity(0))
+        else:
+            workers = multiprocessing.cpu_count()
+    (base, other) = (a, b)
+    if keep_found and a.__same_hashing__(b) and b.__probing__ == a.__probing__ and \
+            b.__cardinality__(b) < a.__cardinality__(a):
+        (base, other) = (b, a)
+    # перехэширование завершается, чтобы все элементы были в одном массиве слотов
+    base.__migrate__(None)
+    slots = base.__slots__
+    if workers <= 1 or None not in slots or \
+            'fork' not in multiprocessing.get_all_start_methods():
+        return a.intersection(b) if keep_found else a.difference(b)
+    start = slots.index(None)
+    bounds = __run_bounds__(base, start, workers)
+    __parallel_state__ = (base, other, keep_found, start)
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            partial = pool.starmap(__partition_task__, zip(bounds, bounds[1:]))
+    finally:
+        __parallel_state__ = None
+    result = PowerSet(base.__size__, base.__hasher__, base.__probing__)
+    (hashes, new_slots, new_hashes) = (base.__hashes__, result.__slots__, result.__hashes__)
+    for moves in partial:
+        pairs = iter(moves)
+        for (k, j) in zip(pairs, pairs):
+            new_slots[k] = slots[j]
+            new_hashes[k] = hashes[j]
+        result.__count__ += len(moves) // 2
+    result.__generation__ += 1
+    return result
+
+
+# границы workers диапазонов в порядке пробирования от свободного слота start:
+# каждая граница сдвигается вперед до ближайшего свободного слота
+def __run_bounds__(base, start, workers):
+    (slots, size, step) = (base.__slots__, base.__size__, base.__step__)
+    bounds = [0]
+    for w in range(1, workers):
+        p = max(size * w // workers, bounds[-1])
+        while p < size and slots[(start + p * step) % size] is not None:
+            p += 1
+        bounds.append(p)
+    bounds.append(size)
+    return bounds
+
+
+# выполняется в процессе-исполнителе над диапазоном [lo; hi) порядка пробирования:
+# оставшиеся элементы в том же порядке занимают первый свободный номер не меньше
+# начала своей цепочки. Так получается корректная таблица и для линейного
+# пробирования, и для Robin Hood (порядок начал цепочек сохраняется), а каждый
+# элемент сдвигается только назад, внутри своей цепочки и своего диапазона
+def __partition_task__(lo, hi):
+    (base, other, keep_found, start) = __parallel_state__
+    (slots, hashes, size) = (base.__slots__, base.__hashes__, base.__size__)
+    step = base.__step__
+    inverse = pow(step, -1, size)
+    removed = base.__REMOVED_FLAG__
+    taken = bytearray(hi - lo)
+    moves = array('q')
+    k = (start + lo * step) % size
+    for p in range(lo, hi):
+        v = slots[k]
+        if v is not None and v is not removed:
+            h = hashes[k]
+            if base.__has_in__(other, h, v) == keep_found:
+                # номер начала цепочки в порядке пробирования от start
+                d = (h % size - start) * inverse % size
+                while taken[d - lo]:
+                    d += 1
+                taken[d - lo] = 1
+                moves.append((start + d * step) % size)
+                moves.append(k)
+        k += step
+        if k >= size:
+            k -= size
+    return moves
+
+
+# импортирует multiprocessing из стандартной библиотеки. queue.py этого каталога
+# перекрывает стандартный модуль queue, если каталог стоит в sys.path раньше
+# (обычный запуск модулей отсюда), а multiprocessing импортирует из queue Empty и Full.
+# На время импорта каталог убирается из sys.path, а уже загруженный отсюда queue -
+# из sys.modules; после импорта имя queue снова означает то же, что и до вызова
+def __multiprocessing__():
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = list(sys.path)
+    before = sys.modules.get('queue')
+    shadow = before is not None and \
+        os.path.dirname(os.path.abspath(getattr(before, '__file__', None) or '')) == here
+    if shadow:
+        del sys.modules['queue']
+    sys.path[:] = [p for p in path if os.path.abspath(p or os.curdir) != here]
+    try:
+        import multiprocessing.pool
+        import multiprocessing.queues  # noqa: F401 - импортируется при создании Pool
+    finally:
+        shadowed_path = len(sys.path) != len(path)
+        sys.path[:] = path
+        if shadow:
+            sys.modules['queue'] = before
+        elif before is None and shadowed_path:
+            # стандартный queue остается только у multiprocessing
+            sys.modules.pop('queue', None)
+    return multiprocessing
+
+
+# Неизменяемая копия PowerSet. При создании один раз вычисляются:
+#   - количество элементов;
+#   - отпечаток - сумма перемешанных хэшей элементов по модулю 2**64,
+#     не зависит от порядка элементов и от стратегии хэширования исходного множества;
+#   - сигнатура - 64-битная маска, в которой каждый элемент устанавливает один бит.
+# Неравные множества и заведомо не подмножества в большинстве случаев отсеиваются
+# сравнением этих чисел за O(1). Множество hashable, поэтому может храниться
+# в HashTable/NativeDictionary (например, с BuiltinHasher).
+class FrozenPowerSet:
+    # перемешивание встроенного hash() элемента, чтобы в отпечатке и сигнатуре
+    # участвовали все биты
+    __MIXER__ = IntHasher()
+
+    # KOHCTPYKTOP
+    # постусловие: создана копия множества power_set (PowerSet)
+    def __init__(self, power_set):
+        self.__set__ = power_set.__result_set__(power_set.size())
+        fingerprint = 0
+        signature = 0
+        for (v, h) in power_set.__entries__():
+            self.__set__.__put_new__(h, v)
+            m = self.__MIXER__.hash_fun(hash(v) & MASK64)
+            fingerprint += m
+            signature |= 1 << (m >> 58)
+        self.__fingerprint__ = fingerprint & MASK64
+        self.__signature__ = signature
+
+    # ЗАПРОСЫ
+    def has(self, value):
+        return self.__set__.has(value)
+
+    def values(self):
+        return self.__set__.values()
+
+    def size(self):
+        return self.__set__.size()
+
+    def fingerprint(self):
+        return self.__fingerprint__
+
+    def signature(self):
+        return self.__signature__
+
+    # результаты операций - новые изменяемые PowerSet
+    def intersection(self, other_set):
+        return self.__set__.intersection(other_set)
+
+    def union(self, other_set):
+        return self.__set__.union(other_set)
+
+    def difference(self, other_set):
+        return self.__set__.difference(other_set)
+
+    # изменяемая копия множества
+    def thaw(self):
+        return self.__set__.union(self.__set__.__result_set__(0))
+
+    # проверка, будет ли other_set подмножеством текущего множества;
+    # для FrozenPowerSet сначала сравниваются размеры и сигнатуры
+    def issubset(self, other_set):
+        if isinstance(other_set, FrozenPowerSet):
+            if (other_set.size() > self.size()
+                    or other_set.__signature__ & ~self.__signature__ != 0):
+                return False
+            other_set = other_set.__set__
+        return self.__set__.issubset(other_set)
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenPowerSet):
+            return NotImplemented
+        return (self.__fingerprint__ == other.__fingerprint__
+                and self.__signature__ == other.__signature__
+                and self.size() == other.size()
+                and self.__set__.issubset(other.__set__))
+
+    def __hash__(self):
+        return self.__fingerprint__
+
+
+# Общий для нескольких BitsetPowerSet каталог элементов: каждому элементу
+# при первом добавлении присваивается номер бита (интернирование)
+class PowerSetUniverse:
+    INTERN_STATUS_OK = 0
+    INTERN_STATUS_FAIL = 1  # каталог заполнен
+
+    # КОНСТРУКТОР
+    # постусловие: создан пустой каталог не более чем на max_size элементов
+    def __init__(self, max_size, hasher=None):
+        self.__size__ = max_size
+        self.__indices__ = NativeDictionary(max_size * 4 // 3 + 1, hasher)
+        self.__elements__ = []
+        self.__intern_status__ = self.INTERN_STATUS_FAIL
+
+    # КОМАНДЫ
+    # предусловие: элемент уже есть в каталоге или в каталоге есть место
+    # постусловие: элементу присвоен номер бита
+    def intern(self, value):
+        self.__intern_status__ = self.INTERN_STATUS_FAIL
+        if self.__intern__(value) >= 0:
+            self.__intern_status__ = self.INTERN_STATUS_OK
+
+    # ЗАПРОСЫ
+    # возвращает номер бита элемента или -1, если элемента нет в каталоге
+    def index(self, value):
+        result = self.__indices__.get(value)
+        if result is None:
+            result = -1
+        return result
+
+    # предусловие: 0 <= index < size()
+    def element(self, index):
+        return self.__elements__[index]
+
+    def size(self):
+        return len(self.__elements__)
+
+    def get_intern_status(self):
+        return self.__intern_status__
+
+    # вспомогательные private функции
+    # возвращает номер бита элемента, при необходимости добавляя его в каталог; -1 - нет места
+    def __intern__(self, value):
+        result = self.index(value)
+        if result < 0 and len(self.__elements__) < self.__size__:
+            result = len(self.__elements__)
+            self.__indices__.add(value, result)
+            self.__elements__.append(value)
+        return result
+
+    # элементы, соответствующие установленным битам bits (tuple)
+    def __elements_of__(self, bits):
+        elems = []
+        # двоичная запись от младшего бита к старшему, единицы ищутся str.find
+        digits = bin(bits)[:1:-1]
+        i = digits.find('1')
+        while i >= 0:
+            elems.append(self.__elements__[i])
+            i = digits.find('1', i + 1)
+        return tuple(elems)
+
+
+# Множество из элементов заранее известного каталога (PowerSetUniverse):
+# хранится как битовая маска номеров элементов - bytearray на весь каталог
+# (бит i - бит (i & 7) байта i >> 3). add/remove/has меняют или читают один байт
+# на месте, без создания длинных целых размером с каталог; операции над
+# множествами одного каталога переводят маски в длинные целые (int.from_bytes)
+# и выполняют одну побитовую операцию над машинными словами.
+# Количество элементов поддерживается при каждой команде.
+# Емкость множества ограничена размером каталога.
+class BitsetPowerSet(AbstractPowerSet):
+
+    # KOHCTPYKTOP
+    # постусловие: создано пустое множество над каталогом universe
+    def __init__(self, universe):
+        self.__universe__ = universe
+        self.__bits__ = bytearray((universe.__size__ + 7) // 8)
+        self.__count__ = 0
+        self.__add_status__ = self.ADD_STATUS_FAIL
+        self.__intersection_status__ = self.INTERSECTION_STATUS_FAIL
+        self.__union_status__ = self.UNION_STATUS_FAIL
+        self.__difference_status__ = self.DIFFERENCE_STATUS_FAIL
+        self.__intersection_update_status__ = self.INTERSECTION_UPDATE_STATUS_FAIL
+        self.__union_update_status__ = self.UNION_UPDATE_STATUS_FAIL
+        self.__difference_update_status__ = self.DIFFERENCE_UPDATE_STATUS_FAIL
+
+    # КОМАНДЫ
+    def add(self, value):
+        self.__add_status__ = self.ADD_STATUS_FAIL
+        i = self.__universe__.__intern__(value)
+        if i >= 0:
+            (byte, mask) = (self.__bits__[i >> 3], 1 << (i & 7))
+            if not byte & mask:
+                self.__bits__[i >> 3] = byte | mask
+                self.__count__ += 1
+            self.__add_status__ = self.ADD_STATUS_OK
+
+    def remove(self, value):
+        i = self.__universe__.index(value)
+        if i >= 0:
+            (byte, mask) = (self.__bits__[i >> 3], 1 << (i & 7))
+            if byte & mask:
+                self.__bits__[i >> 3] = byte & ~mask
+                self.__count__ -= 1
+
+    # удаленных слотов нет, уплотнять нечего
+    def compact(self):
+        pass
+
+    def intersection_update(self, other_set):
+        (bits, _) = self.__bits_of__(other_set, False)
+        self.__set_mask__(self.__mask__() & bits)
+        self.__intersection_update_status__ = self.INTERSECTION_UPDATE_STATUS_OK
+
+    def union_update(self, other_set):
+        self.__union_update_status__ = self.UNION_UPDATE_STATUS_FAIL
+        (bits, complete) = self.__bits_of__(other_set, True)
+        if complete:
+            self.__set_mask__(self.__mask__() | bits)
+            self.__union_update_status__ = self.UNION_UPDATE_STATUS_OK
+
+    def difference_update(self, other_set):
+        (bits, _) = self.__bits_of__(other_set, False)
+        self.__set_mask__(self.__mask__() & ~bits)
+        self.__difference_update_status__ = self.DIFFERENCE_UPDATE_STATUS_OK
+
+    # ЗАПРОСЫ
+    def has(self, value):
+        i = self.__universe__.index(value)
+        return i >= 0 and (self.__bits__[i >> 3] >> (i & 7)) & 1 == 1
+
+    def get_add_status(self):
+        return self.__add_status__
+
+    def values(self):
+        return self.__universe__.__elements_of__(self.__mask__())
+
+    def size(self):
+        return self.__count__
+
+    def intersection(self, other_set):
+        (bits, _) = self.__bits_of__(other_set, False)
+        s = self.__result_set__(self.__mask__() & bits)
+        self.__intersection_status__ = self.INTERSECTION_STATUS_OK
+        return s
+
+    def union(self, other_set):
+        self.__union_status__ = self.UNION_STATUS_FAIL
+        (bits, complete) = self.__bits_of__(other_set, True)
+        s = self.__result_set__(self.__mask__() | bits)
+        if complete:
+            self.__union_status__ = self.UNION_STATUS_OK
+        return s
+
+    def difference(self, other_set):
+        (bits, _) = self.__bits_of__(other_set, False)
+        s = self.__result_set__(self.__mask__() & ~bits)
+        self.__difference_status__ = self.DIFFERENCE_STATUS_OK
+        return s
+
+    def issubset(self, other_set):
+        (bits, complete) = self.__bits_of__(other_set, False)
+        return complete and bits & ~self.__mask__() == 0
+
+    # запросы статусов
+    def get_intersection_status(self):
+        return self.__intersection_status__
+
+    def get_union_status(self):
+        return self.__union_status__
+
+    def get_difference_status(self):
+        return self.__difference_status__
+
+    def get_intersection_update_status(self):
+        return self.__intersection_update_status__
+
+    def get_union_update_status(self):
+        return self.__union_update_status__
+
+    def get_difference_update_status(self):
+        return self.__difference_update_status__
+
+    # вспомогательные private функции
+    # битовая маска множества в виде длинного целого
+    def __mask__(self):
+        return int.from_bytes(self.__bits__, 'little')
+
+    # заменяет содержимое множества маской bits (длинное целое)
+    def __set_mask__(self, bits):
+        self.__bits__[:] = bits.to_bytes(len(self.__bits__), 'little')
+        self.__count__ = bits.bit_count()
+
+    # возвращает (битовая маска other_set в каталоге этого множества, все ли элементы вошли);
+    # для множества над тем же каталогом маска берется как есть,
+    # иначе элементы ищутся (при intern=True - добавляются) в каталоге по одному
+    # и отмечаются в bytearray, который переводится в длинное целое один раз
+    def __bits_of__(self, other_set, intern):
+        if isinstance(other_set, BitsetPowerSet) and other_set.__universe__ is self.__universe__:
+            return (other_set.__mask__(), True)
+        bits = bytearray(len(self.__bits__))
+        complete = True
+        for v in other_set.values():
+            i = self.__universe__.__intern__(v) if intern else self.__universe__.index(v)
+            if i >= 0:
+                bits[i >> 3] |= 1 << (i & 7)
+            else:
+                complete = False
+        return (int.from_bytes(bits, 'little'), complete)
+
+    def __result_set__(self, bits):
+        s = BitsetPowerSet(self.__universe__)
+        s.__set_mask__(bits)
+        return s